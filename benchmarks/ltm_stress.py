@@ -0,0 +1,81 @@
+"""
+Teste de estresse da LongTermMemory com vários processos gravando ao mesmo tempo.
+Confere que nenhuma atualização se perde e mede a contenção do lock.
+
+Uso: python -m benchmarks.ltm_stress --workers 8 --eventos 200
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from multiprocessing import Pool
+from modules.memory_agent.long_term import LongTermMemory
+
+
+def _worker(args):
+    pasta, worker_id, eventos, compact_every = args
+
+    ltm = LongTermMemory(
+        memory_file=os.path.join(pasta, "ltm.json"),
+        log_file=os.path.join(pasta, "ltm.log"),
+        compact_every=compact_every
+    )
+
+    for i in range(eventos):
+        ltm.record_success({
+            "plataforma": f"plataforma_{worker_id % 3}",
+            "criativo_tipo": "video",
+            "icp_interesses": [f"interesse_{i % 7}"]
+        }, 0.5)
+
+        # Leitura concorrente, como o MemoryAgent.get_context faz
+        ltm.get_stats()
+
+    return ltm.lock_stats
+
+
+def executar(workers: int, eventos: int, compact_every: int) -> dict:
+    with tempfile.TemporaryDirectory() as pasta:
+        inicio = time.perf_counter()
+
+        with Pool(workers) as pool:
+            stats = pool.map(_worker, [(pasta, w, eventos, compact_every) for w in range(workers)])
+
+        duracao = time.perf_counter() - inicio
+
+        final = LongTermMemory(
+            memory_file=os.path.join(pasta, "ltm.json"),
+            log_file=os.path.join(pasta, "ltm.log")
+        ).get_stats()
+
+    esperado = workers * eventos
+    aquisicoes = sum(s["acquisitions"] for s in stats)
+    espera_total = sum(s["wait_total_s"] for s in stats)
+
+    return {
+        "workers": workers,
+        "eventos_por_worker": eventos,
+        "esperado": esperado,
+        "total_executions": final["total_executions"],
+        "atualizacoes_perdidas": esperado - final["total_executions"],
+        "duracao_s": round(duracao, 3),
+        "eventos_por_s": round(esperado / duracao, 1),
+        "lock_aquisicoes": aquisicoes,
+        "lock_espera_media_ms": round(espera_total / max(aquisicoes, 1) * 1000, 3),
+        "lock_espera_max_ms": round(max(s["wait_max_s"] for s in stats) * 1000, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--eventos", type=int, default=200)
+    parser.add_argument("--compact-every", type=int, default=50)
+    args = parser.parse_args()
+
+    resultado = executar(args.workers, args.eventos, args.compact_every)
+    print(json.dumps(resultado, indent=4, ensure_ascii=False))
+
+    if resultado["atualizacoes_perdidas"]:
+        raise SystemExit(1)
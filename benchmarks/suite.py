@@ -0,0 +1,309 @@
+"""
+Benchmarks do pipeline com dados sintéticos, sem rede (LLM substituída por um stub)
+e com banco SQLite local descartável.
+
+Cada benchmark roda `--repeticoes` vezes para o tempo (melhor e mediana) e uma vez
+extra sob tracemalloc para o pico de memória. O resultado vai para
+benchmarks/results/<data>_<commit>.json, para comparar entre commits:
+
+    python -m benchmarks.suite --tamanhos 1000 100000 1000000
+    python -m benchmarks.suite --comparar benchmarks/results/A.json benchmarks/results/B.json
+"""
+import atexit
+import os
+import shutil
+import tempfile
+
+# Banco e arquivos isolados antes de qualquer import de modules.* (Config lê o ambiente no import).
+# DATABASE_URL é sempre sobrescrito: o benchmark grava milhares de estratégias e
+# nunca deve apontar para o banco configurado no ambiente ou no .env
+_PASTA_TEMP = tempfile.mkdtemp(prefix="precog_bench_")
+atexit.register(shutil.rmtree, _PASTA_TEMP, ignore_errors=True)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_PASTA_TEMP, 'bench.db')}"
+os.environ.setdefault("SQL_MONITOR_ENABLED", "false")
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from benchmarks.synthetic_data import gerar
+from modules.analyst import processar_e_achar_padroes
+from modules.score_agent import ScoreAgent
+from modules.ab_agent import ABAgent
+from modules.memory_agent.long_term import LongTermMemory
+from modules.persistence import init_db, create_strategy_record
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+TAMANHOS_PADRAO = [1_000, 100_000, 1_000_000]
+CANDIDATAS_PADRAO = [10, 1_000, 100_000]
+EVENTOS_LTM_PADRAO = 2_000
+ESTRATEGIAS_DB_PADRAO = 500
+
+_INTERESSES = [f"interesse_{i}" for i in range(500)]
+_MENSAGENS = [
+    "Conheça a nova coleção pensada para a sua rotina",
+    "Aproveite agora o desconto exclusivo da semana",
+    "Descubra como economizar tempo todos os dias",
+    "Não perca a chance de experimentar grátis",
+    "Resultados reais para quem busca praticidade"
+]
+
+
+# ---------- STUB DA LLM ----------
+def estrategia_stub(insights: dict, plataforma: str, objetivo: str, rng) -> dict:
+    """
+    Mesmo formato de gerar_estrategia_llm, sem rede. Varia os campos que as
+    regras do ScoreAgent olham, para que flags e empates apareçam como na prática.
+    """
+    comportamento = dict(insights.get("icp_comportamento") or {})
+    comportamento["expected_roas"] = round(float(rng.lognormal(np.log(4), 0.8)), 2)
+    comportamento["conversion_rate"] = round(float(rng.lognormal(np.log(5), 0.9)), 2)
+    comportamento["click_volume"] = int(rng.lognormal(np.log(800), 1.2))
+
+    # Cauda longa de interesses, como a saída real da LLM
+    interesses = rng.zipf(1.3, size=3) % len(_INTERESSES)
+
+    return {
+        "plataforma": plataforma,
+        "objetivo": objetivo,
+        "icp_demografia": dict(insights.get("icp_demografia") or {}),
+        "icp_comportamento": comportamento,
+        "perfil_alvo_descricao": "Perfil sintético para benchmark.",
+        "icp_interesses": [_INTERESSES[i] for i in interesses],
+        "mensagem_template": _MENSAGENS[rng.randint(len(_MENSAGENS))],
+        "palavras_chave": [f"palavra_{rng.randint(1000)}" for _ in range(4)],
+        "criativo_tipo": ["video", "imagem", "carrossel", "search"][rng.randint(4)],
+        "posicionamentos": ["feed", "reels"],
+        "racional_estrategico": "Stub.",
+        "versao_modelo_llm": "stub"
+    }
+
+
+def _insights_base() -> dict:
+    return {
+        "status": "success",
+        "icp_demografia": {"age_range": "25-34", "gender": "F", "location": "Brazil"},
+        "icp_comportamento": {"expected_roas": 3.0, "conversion_rate": 4.0, "click_volume": 1000}
+    }
+
+
+def _estrategias(n: int, seed: int = 42) -> list:
+    rng = np.random.RandomState(seed)
+    insights = _insights_base()
+    return [estrategia_stub(insights, "meta_ads", "leads", rng) for _ in range(n)]
+
+
+# ---------- MEDIÇÃO ----------
+def medir(nome: str, funcao, itens: int, repeticoes: int = 3, preparar=None) -> dict:
+    """
+    Executa funcao(preparar()) `repeticoes` vezes para o tempo e uma vez sob
+    tracemalloc para o pico de memória. `preparar` fica fora da medição.
+    """
+    preparar = preparar or (lambda: None)
+    tempos = []
+
+    for _ in range(repeticoes):
+        entrada = preparar()
+        inicio = time.perf_counter()
+        funcao(entrada)
+        tempos.append(time.perf_counter() - inicio)
+
+    entrada = preparar()
+    tracemalloc.start()
+    try:
+        funcao(entrada)
+        pico = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    melhor = min(tempos)
+    resultado = {
+        "benchmark": nome,
+        "itens": itens,
+        "repeticoes": repeticoes,
+        "melhor_s": round(melhor, 6),
+        "mediana_s": round(statistics.median(tempos), 6),
+        "itens_por_s": round(itens / melhor, 1) if melhor > 0 else None,
+        "pico_memoria_mb": round(pico / 2**20, 2)
+    }
+    print(
+        f"  {nome:<32} {itens:>12,} itens | {melhor * 1000:>10.1f} ms | "
+        f"{resultado['itens_por_s'] or 0:>14,.0f}/s | {resultado['pico_memoria_mb']:>8.1f} MB"
+    )
+    return resultado
+
+
+# ---------- BENCHMARKS ----------
+def bench_analyst(tamanhos: list, repeticoes: int) -> list:
+    resultados = []
+    for n in tamanhos:
+        df = gerar(n)
+        # O analista altera colunas numéricas in-place: cada repetição recebe uma cópia
+        resultados.append(medir(
+            "analyst.processar_e_achar_padroes", processar_e_achar_padroes, n,
+            repeticoes, preparar=df.copy
+        ))
+        del df
+    return resultados
+
+
+def bench_score(candidatas: list, repeticoes: int) -> list:
+    resultados = []
+    for n in candidatas:
+        estrategias = _estrategias(n)
+        if n <= 10_000:
+            resultados.append(medir(
+                "score.avaliar (loop)", lambda _: [ScoreAgent.avaliar(e) for e in estrategias], n, repeticoes
+            ))
+        resultados.append(medir("score.avaliar_lote", lambda _: ScoreAgent.avaliar_lote(estrategias), n, repeticoes))
+    return resultados
+
+
+def bench_ab(candidatas: list, repeticoes: int) -> list:
+    resultados = []
+    for n in candidatas:
+        if n < 2:
+            continue
+        estrategias = _estrategias(n)
+        resultados.append(medir("ab.comparar", lambda _: ABAgent.comparar(estrategias), n, repeticoes))
+    return resultados
+
+
+def bench_ltm(eventos: int, repeticoes: int) -> list:
+    estrategias = _estrategias(eventos)
+
+    def _abrir(pasta):
+        return LongTermMemory(
+            memory_file=os.path.join(pasta, "ltm.json"),
+            log_file=os.path.join(pasta, "ltm.log")
+        )
+
+    def preparar():
+        # Memória nova e vazia a cada repetição
+        return _abrir(tempfile.mkdtemp(dir=_PASTA_TEMP))
+
+    def gravar(ltm):
+        for estrategia in estrategias:
+            ltm.record_success(estrategia, 0.8)
+
+    # Reabertura: snapshot + replay do log remanescente
+    pasta_cheia = tempfile.mkdtemp(dir=_PASTA_TEMP)
+    gravar(_abrir(pasta_cheia))
+
+    def abrir(_):
+        _abrir(pasta_cheia).get_insights()
+
+    return [
+        medir("ltm.record_success", gravar, eventos, repeticoes, preparar=preparar),
+        medir("ltm.abrir_e_insights", abrir, 1, repeticoes)
+    ]
+
+
+def bench_persistencia(n: int, repeticoes: int) -> list:
+    init_db()
+    estrategias = _estrategias(n)
+
+    def persistir(_):
+        for i, estrategia in enumerate(estrategias):
+            create_strategy_record(estrategia, name=f"bench_{i}")
+
+    return [medir("persistence.create_strategy_record", persistir, n, repeticoes)]
+
+
+# ---------- RESULTADOS ----------
+def _commit_atual() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecido"
+
+
+def salvar(resultados: list, pasta: str = RESULTS_DIR) -> str:
+    os.makedirs(pasta, exist_ok=True)
+    commit = _commit_atual()
+    agora = datetime.now()
+
+    saida = {
+        "commit": commit,
+        "executado_em": agora.isoformat(timespec="seconds"),
+        "ambiente": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "maquina": platform.machine(),
+            "cpus": os.cpu_count()
+        },
+        "resultados": resultados
+    }
+
+    caminho = os.path.join(pasta, f"{agora.strftime('%Y%m%d_%H%M%S')}_{commit}.json")
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(saida, f, indent=4, ensure_ascii=False)
+    return caminho
+
+
+def comparar(caminho_base: str, caminho_novo: str):
+    """
+    Razão de tempo (novo / base) por benchmark e tamanho; < 1 é melhora.
+    """
+    def _carregar(caminho):
+        with open(caminho, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return raw["commit"], {(r["benchmark"], r["itens"]): r for r in raw["resultados"]}
+
+    commit_base, base = _carregar(caminho_base)
+    commit_novo, novo = _carregar(caminho_novo)
+
+    print(f"{commit_base} -> {commit_novo}")
+    for chave in sorted(base.keys() & novo.keys()):
+        antes, depois = base[chave], novo[chave]
+        razao = depois["melhor_s"] / antes["melhor_s"] if antes["melhor_s"] else float("nan")
+        print(
+            f"  {chave[0]:<32} {chave[1]:>12,} | {antes['melhor_s'] * 1000:>10.1f} ms -> "
+            f"{depois['melhor_s'] * 1000:>10.1f} ms ({razao:.2f}x) | "
+            f"{antes['pico_memoria_mb']:.1f} -> {depois['pico_memoria_mb']:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=TAMANHOS_PADRAO,
+                        help="linhas de dados de campanha para o analista")
+    parser.add_argument("--candidatas", type=int, nargs="+", default=CANDIDATAS_PADRAO,
+                        help="quantidade de estratégias para ScoreAgent/ABAgent")
+    parser.add_argument("--eventos-ltm", type=int, default=EVENTOS_LTM_PADRAO)
+    parser.add_argument("--estrategias-db", type=int, default=ESTRATEGIAS_DB_PADRAO)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--somente", nargs="+", choices=["analyst", "score", "ab", "ltm", "persistence"])
+    parser.add_argument("--comparar", nargs=2, metavar=("BASE", "NOVO"))
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        raise SystemExit(0)
+
+    etapas = {
+        "analyst": lambda: bench_analyst(args.tamanhos, args.repeticoes),
+        "score": lambda: bench_score(args.candidatas, args.repeticoes),
+        "ab": lambda: bench_ab(args.candidatas, args.repeticoes),
+        "ltm": lambda: bench_ltm(args.eventos_ltm, args.repeticoes),
+        "persistence": lambda: bench_persistencia(args.estrategias_db, args.repeticoes)
+    }
+
+    resultados = []
+    for nome, etapa in etapas.items():
+        if args.somente and nome not in args.somente:
+            continue
+        print(f"▶ {nome}")
+        resultados.extend(etapa())
+
+    print(f"\n💾 Resultados em {salvar(resultados)}")
@@ -0,0 +1,125 @@
+"""
+Gerador de dados sintéticos de campanha com as mesmas colunas de
+data/campaign_data_realistic.csv.
+
+A distribuição de linhas entre segmentos (idade x gênero x plataforma x device)
+segue uma Zipf, como no tráfego real: poucos segmentos concentram a maior parte
+do volume. Cada segmento tem CTR, CVR, CPC e ticket próprios, então o ROAS
+varia entre segmentos e o analista tem um vencedor a encontrar.
+
+Gera em blocos, então escala de 1k a 100M linhas com memória constante.
+
+Uso: python -m benchmarks.synthetic_data --linhas 10000000 --saida data/bench/campanhas_10m.csv
+"""
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+import pandas as pd
+
+COLUNAS = ["age_range", "gender", "platform", "device", "spend", "revenue", "clicks", "impressions", "conversions"]
+
+FAIXAS_ETARIAS = ["18-24", "25-34", "35-44", "45-54", "55-64", "65+"]
+GENEROS = ["F", "M", "U"]
+PLATAFORMAS = ["instagram", "facebook", "tiktok", "google", "youtube"]
+DEVICES = ["mobile", "desktop", "tablet"]
+
+EXPOENTE_ZIPF = 1.1
+BLOCO_PADRAO = 1_000_000
+
+
+def _segmentos(rng: np.random.RandomState) -> pd.DataFrame:
+    """
+    Todos os segmentos com peso Zipf (ordem embaralhada) e parâmetros de performance.
+    """
+    combinacoes = list(itertools.product(FAIXAS_ETARIAS, GENEROS, PLATAFORMAS, DEVICES))
+    n = len(combinacoes)
+
+    pesos = 1.0 / np.arange(1, n + 1) ** EXPOENTE_ZIPF
+    rng.shuffle(pesos)
+
+    segmentos = pd.DataFrame(combinacoes, columns=["age_range", "gender", "platform", "device"])
+    segmentos["peso"] = pesos / pesos.sum()
+    segmentos["ctr"] = rng.lognormal(np.log(0.02), 0.4, n).clip(0.001, 0.2)
+    segmentos["cvr"] = rng.lognormal(np.log(0.03), 0.5, n).clip(0.001, 0.5)
+    segmentos["cpc"] = rng.lognormal(np.log(0.8), 0.3, n)
+    segmentos["ticket"] = rng.lognormal(np.log(60), 0.4, n)
+    return segmentos
+
+
+def gerar_blocos(n_linhas: int, bloco: int = BLOCO_PADRAO, seed: int = 42):
+    """
+    Gera DataFrames de até `bloco` linhas somando `n_linhas`.
+    Mesma seed -> mesmos dados (benchmarks repetíveis).
+    """
+    rng = np.random.RandomState(seed)
+    segmentos = _segmentos(rng)
+    pesos = segmentos["peso"].to_numpy()
+
+    restantes = n_linhas
+    while restantes > 0:
+        n = min(bloco, restantes)
+        restantes -= n
+
+        idx = rng.choice(len(segmentos), size=n, p=pesos)
+        seg = segmentos.iloc[idx]
+
+        impressions = rng.lognormal(np.log(3000), 1.0, n).astype(np.int64) + 1
+        clicks = rng.binomial(impressions, seg["ctr"].to_numpy())
+        conversions = rng.binomial(clicks, seg["cvr"].to_numpy())
+        spend = np.round(clicks * seg["cpc"].to_numpy() * rng.lognormal(0, 0.2, n), 2)
+        revenue = np.round(conversions * seg["ticket"].to_numpy() * rng.lognormal(0, 0.3, n), 2)
+
+        # Colunas de texto (object), como o pd.read_csv do main.py entrega
+        df = pd.DataFrame({
+            coluna: seg[coluna].to_numpy()
+            for coluna in ("age_range", "gender", "platform", "device")
+        })
+        df["spend"] = spend
+        df["revenue"] = revenue
+        df["clicks"] = clicks
+        df["impressions"] = impressions
+        df["conversions"] = conversions
+
+        yield df[COLUNAS]
+
+
+def gerar(n_linhas: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Tudo em memória (para tamanhos que cabem na RAM).
+    """
+    return pd.concat(list(gerar_blocos(n_linhas, seed=seed)), ignore_index=True)
+
+
+def gravar_csv(caminho: str, n_linhas: int, bloco: int = BLOCO_PADRAO, seed: int = 42) -> dict:
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+
+    inicio = time.perf_counter()
+    temporario = caminho + ".tmp"
+
+    with open(temporario, "w", encoding="utf-8", newline="") as f:
+        for i, df in enumerate(gerar_blocos(n_linhas, bloco=bloco, seed=seed)):
+            df.to_csv(f, header=(i == 0), index=False)
+
+    os.replace(temporario, caminho)
+
+    return {
+        "arquivo": caminho,
+        "linhas": n_linhas,
+        "bytes": os.path.getsize(caminho),
+        "duracao_s": round(time.perf_counter() - inicio, 3)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=100_000)
+    parser.add_argument("--saida", required=True)
+    parser.add_argument("--bloco", type=int, default=BLOCO_PADRAO)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(gravar_csv(args.saida, args.linhas, bloco=args.bloco, seed=args.seed))
@@ -16,4 +16,37 @@ class Config:
         raise ValueError("❌ Erro: A variável DATABASE_URL não foi encontrada no arquivo .env")
 
     # --- CHAVES DE API (IA) ---
-    LLM_API_KEY = os.getenv("LLM_API_KEY")
\ No newline at end of file
+    LLM_API_KEY = os.getenv("LLM_API_KEY")
+    LLM_PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "2000"))  # tokens de prompt por chamada
+    # Orçamento pela estimativa local calibrada; count_tokens (1 round-trip) só quando a
+    # estimativa fica a menos de LLM_COUNT_TOKENS_MARGIN (fração) do orçamento
+    LLM_COUNT_TOKENS_API = os.getenv("LLM_COUNT_TOKENS_API", "true").lower() in ("1", "true", "yes")
+    LLM_COUNT_TOKENS_MARGIN = float(os.getenv("LLM_COUNT_TOKENS_MARGIN", "0.15"))
+    LLM_LATENCY_ESTIMATE_S = float(os.getenv("LLM_LATENCY_ESTIMATE_S", "6"))  # para estimar o tempo economizado no reuso
+
+    # --- REUSO DE ESTRATÉGIAS ---
+    # Desvio relativo máximo de icp_comportamento para reaproveitar a última estratégia aprovada (0 desliga)
+    STRATEGY_REUSE_TOLERANCE = float(os.getenv("STRATEGY_REUSE_TOLERANCE", "0.05"))
+
+    # --- RETENÇÃO DE LEADS (PostgreSQL particionado) ---
+    LEADS_RETENTION_MONTHS = int(os.getenv("LEADS_RETENTION_MONTHS", "6"))
+    LEADS_ARCHIVE_DIR = os.getenv("LEADS_ARCHIVE_DIR", "data/archive")
+
+    # --- FEEDBACK (agregação incremental dos leads) ---
+    # Janela relida antes da marca d'água: deve cobrir o atraso máximo de gravação da APP B
+    FEEDBACK_WATERMARK_OVERLAP_MINUTES = int(os.getenv("FEEDBACK_WATERMARK_OVERLAP_MINUTES", "60"))
+
+    # --- SCORE AGENT ---
+    # JSON opcional com regras/penalidades (ver modules/score_agent.py)
+    SCORE_RULES_PATH = os.getenv("SCORE_RULES_PATH")
+
+    # --- OBSERVABILIDADE ---
+    TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+    TRACE_MEMORY = os.getenv("TRACE_MEMORY", "false").lower() in ("1", "true", "yes")  # tracemalloc (mais lento)
+    TRACE_FILE = os.getenv("TRACE_FILE", "logs/trace.jsonl")
+    METRICS_FILE = os.getenv("METRICS_FILE", "logs/metrics.prom")
+
+    # --- MONITOR DE SQL ---
+    SQL_MONITOR_ENABLED = os.getenv("SQL_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+    SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))  # mesma query N vezes = suspeita de N+1
@@ -3,18 +3,30 @@ import os
 import pandas as pd
 from datetime import datetime
 from modules.analyst import processar_e_achar_padroes
-from modules.persistence import init_db, create_strategy_record
+from modules.persistence import (
+    init_db, create_strategy_record, refresh_strategy_record, save_segment_metrics, get_segment_baseline
+)
 from modules.feedback_agent import FeedbackAgent
 from modules.orchestrator_agent.orchestrator_agent import OrchestratorAgent
+from modules.tracing import span, RUN_ID
+from modules import sql_monitor
 
 
 PLATAFORMA = "meta_ads"      # ou google_ads
 OBJETIVO = "construcao_de_marca_e_desejo"       # ou leads, traffic, sales
 
 def main():
+    try:
+        with span("pipeline", plataforma=PLATAFORMA, objetivo=OBJETIVO):
+            _executar()
+    finally:
+        sql_monitor.imprimir_resumo()
+
+def _executar():
     print("\n🚀 --- INICIANDO PRECOG ---\n")
 
-    init_db()
+    with span("init_db"):
+        init_db()
 
     # 1. Ingestão de Dados
     DATA_DIR = "data"
@@ -41,23 +53,46 @@ def main():
 
     # Leitura do CSV
     try:
-        df = pd.read_csv(csv_path)
+        with span("ingest", arquivo=csv_files[0]) as s:
+            df = pd.read_csv(csv_path)
+            s.set(rows=len(df))
         print(f"📊 Dados carregados com sucesso ({len(df)} linhas).")
     except Exception as e:
         print(f"❌ Erro crítico na ingestão de dados: {e}")
         return
 
     # 2. Análise (Data → Insights)
-    insights = processar_e_achar_padroes(df)
+    with span("analyze", rows=len(df)):
+        insights = processar_e_achar_padroes(df)
 
     if insights.get("status") != "success":
         print(f"❌ Processo interrompido: {insights.get('reason')}")
         return
-    
+
+    # Histórico do segmento vencedor (antes de gravar a execução atual) + cubo de segmentos
+    try:
+        with span("segment_history", rows=len(insights["segmentos"])):
+            demografia = insights["icp_demografia"]
+            baseline = get_segment_baseline(demografia["age_range"], demografia["gender"])
+
+            if baseline["status"] == "success":
+                insights["baseline_historico"] = baseline
+                print(
+                    f"📈 ROAS atual {insights['icp_comportamento']['expected_roas']} | "
+                    f"histórico {baseline['roas']} ({baseline['execucoes']} execuções)"
+                )
+
+            save_segment_metrics(RUN_ID, insights["segmentos"])
+    except Exception as e:
+        # Histórico é auxiliar: não interrompe o pipeline
+        print(f"⚠️ Falha ao registrar métricas por segmento: {e}")
+
     # 3. Estratégia (Insights → LLM) + A/B TEST
     try:
-        orchestrator = OrchestratorAgent(plataforma=PLATAFORMA, objetivo=OBJETIVO)
-        result = orchestrator.executar_pipeline(insights)
+        with span("orchestrator") as s:
+            orchestrator = OrchestratorAgent(plataforma=PLATAFORMA, objetivo=OBJETIVO)
+            result = orchestrator.executar_pipeline(insights)
+            s.set(status=result["status"])
 
         if result["status"] != "APPROVED":
             print("🚫 Pipeline interrompido pelo Orchestrator.")
@@ -73,23 +108,48 @@ def main():
     nome_campanha = f"Otimização_{datetime.now().strftime('%Y-%m-%d_%H-%M')}"
 
     try:
-        strategy_record = create_strategy_record(
-            data=estrategia_final,
-            name=nome_campanha
-        )
-
-        print(
-            f"💾 Estratégia persistida com sucesso | "
-            f"ID={strategy_record.id} | Status={strategy_record.status}"
-        )
+        if result.get("reused_strategy_id"):
+            # Estratégia reaproveitada: só atualiza as métricas observadas da linha existente
+            with span("persist", rows=1, reused=True):
+                strategy_record = refresh_strategy_record(
+                    strategy_id=result["reused_strategy_id"],
+                    icp_comportamento=estrategia_final["icp_comportamento"]
+                )
+
+            print(
+                f"💾 Estratégia reutilizada e atualizada | "
+                f"ID={strategy_record.id} | Status={strategy_record.status} | "
+                f"LLM evitada: {result['llm_calls_skipped']} chamada(s), ~{result['tempo_economizado_s']:.1f}s"
+            )
+
+        else:
+            with span("persist", rows=1):
+                strategy_record = create_strategy_record(
+                    data=estrategia_final,
+                    name=nome_campanha
+                )
+
+            print(
+                f"💾 Estratégia persistida com sucesso | "
+                f"ID={strategy_record.id} | Status={strategy_record.status}"
+            )
+
+            # Mantém o índice de quase duplicatas atualizado para as próximas execuções
+            orchestrator.indice_similaridade.adicionar(strategy_record.id, estrategia_final)
+            orchestrator.indice_similaridade.salvar()
 
         # 5. Feedback Agent (SIMULADO)
-        feedback = FeedbackAgent.gerar_feedback_simulado(
-            strategy_id=strategy_record.id
-        )
-
-        print("\n🔄 --- FEEDBACK SIMULADO ---")
-        print(json.dumps(feedback, indent=4, ensure_ascii=False))
+        # Só para linhas novas: a reutilizada pode já ter feedback real (leads, custo por lead)
+        if result.get("reused_strategy_id"):
+            print("\n🔄 Feedback simulado ignorado: estratégia reutilizada mantém o feedback existente.")
+        else:
+            with span("feedback", strategy_id=strategy_record.id):
+                feedback = FeedbackAgent.gerar_feedback_simulado(
+                    strategy_id=strategy_record.id
+                )
+
+            print("\n🔄 --- FEEDBACK SIMULADO ---")
+            print(json.dumps(feedback, indent=4, ensure_ascii=False))
 
     except Exception as e:
         print(f"❌ Falha ao persistir estratégia: {e}")
@@ -1,5 +1,6 @@
+import heapq
 from typing import List, Dict
-from modules.score_agent import ScoreAgent
+from modules.score_agent import ScoreAgent, _valor
 
 
 class ABAgent:
@@ -10,6 +11,9 @@ class ABAgent:
 
     SCORE_MINIMO = 0.6
     DIFERENCA_MINIMA = 0.05  # margem para evitar falso vencedor
+    LIMITE_COMPARACAO_COMPLETA = 10  # acima disso, comparar usa o torneio top-k
+    TOP_K = 5
+    RISCO_RANK = {"low": 3, "medium": 2, "high": 1}
 
     @staticmethod
     def comparar(estrategias: List[Dict]) -> Dict:
@@ -21,6 +25,9 @@ class ABAgent:
         if len(estrategias) < 2:
             raise ValueError("ABAgent requer no mínimo 2 estratégias.")
 
+        if len(estrategias) > ABAgent.LIMITE_COMPARACAO_COMPLETA:
+            return ABAgent.torneio(estrategias)
+
         resultados = []
 
         # Avalia todas as estratégias
@@ -40,6 +47,98 @@ class ABAgent:
             reverse=True
         )
 
+        return ABAgent._decidir(resultados)
+
+    @staticmethod
+    def torneio(estrategias: List[Dict], k: int = None) -> Dict:
+        """
+        Seleção N-way para grandes conjuntos de candidatas.
+        Avalia todas em lote e mantém só as k melhores num heap (O(N log k)),
+        na mesma ordem de comparar (confidence_score, depois ordem de geração),
+        e aplica o mesmo gate (score mínimo, margem, desempate) sobre ela.
+        A fronteira de Pareto da shortlist sobre (confidence_score, risco,
+        flags, ROAS esperado) vai à parte, em "ranking_pareto".
+        """
+
+        if len(estrategias) < 2:
+            raise ValueError("ABAgent requer no mínimo 2 estratégias.")
+
+        k = max(k or ABAgent.TOP_K, 2)
+
+        avaliacao = ScoreAgent.avaliar_lote(estrategias)
+        colunas_flag = [c for c in avaliacao.columns if c.startswith("flag_")]
+
+        scores = avaliacao["confidence_score"].to_numpy()
+        riscos = avaliacao["risk_level"].map(ABAgent.RISCO_RANK).to_numpy()
+        num_flags = avaliacao[colunas_flag].sum(axis=1).to_numpy()
+
+        def criterios(idx):
+            # Todos no sentido "maior é melhor"
+            roas = _valor(estrategias[idx], "icp_comportamento.expected_roas", 0)
+            return (float(scores[idx]), int(riscos[idx]), -int(num_flags[idx]), float(roas))
+
+        # Top-k por heap, mesma ordem do sort estável de comparar:
+        # score decrescente, empates pela ordem de geração
+        shortlist = heapq.nlargest(
+            k, range(len(estrategias)),
+            key=lambda idx: (float(scores[idx]), -idx)
+        )
+
+        pareto = ABAgent._ranks_pareto([criterios(idx) for idx in shortlist])
+        detalhes = ScoreAgent.resultados_lote(avaliacao.iloc[shortlist])
+
+        resultados = [
+            {
+                "index": idx,
+                "estrategia": estrategias[idx],
+                "score": score,
+                "confidence_score": score["confidence_score"],
+                "pareto_rank": rank
+            }
+            for idx, score, rank in zip(shortlist, detalhes, pareto)
+        ]
+
+        decisao = ABAgent._decidir(resultados)
+        decisao["total_candidatos"] = len(estrategias)
+        # Informativo: não altera vencedor nem segundo colocado do gate
+        decisao["ranking_pareto"] = [
+            {"index": r["index"], "pareto_rank": r["pareto_rank"]}
+            for r in sorted(resultados, key=lambda r: r["pareto_rank"])
+        ]
+        return decisao
+
+    @staticmethod
+    def _ranks_pareto(pontos: List[tuple]) -> List[int]:
+        """
+        Rank de não-dominância de cada ponto (0 = fronteira de Pareto).
+        Quadrático, mas só roda na shortlist de tamanho k.
+        """
+
+        def domina(a, b):
+            return all(x >= y for x, y in zip(a, b)) and a != b
+
+        ranks = [None] * len(pontos)
+        restantes = set(range(len(pontos)))
+        nivel = 0
+
+        while restantes:
+            fronteira = {
+                i for i in restantes
+                if not any(domina(pontos[j], pontos[i]) for j in restantes if j != i)
+            }
+            for i in fronteira:
+                ranks[i] = nivel
+            restantes -= fronteira
+            nivel += 1
+
+        return ranks
+
+    @staticmethod
+    def _decidir(resultados: List[Dict]) -> Dict:
+        """
+        Gate do A/B sobre resultados já ordenados (melhor primeiro).
+        """
+
         melhor = resultados[0]
         segundo = resultados[1]
 
@@ -99,8 +198,10 @@ class ABAgent:
         if len(a["score"]["flags"]) != len(b["score"]["flags"]):
             return a if len(a["score"]["flags"]) < len(b["score"]["flags"]) else b
 
-        # Estratégia mais simples (menos componentes)
-        if len(a["estrategia"]) != len(b["estrategia"]):
-            return a if len(a["estrategia"]) < len(b["estrategia"]) else b
+        # Maior ROAS esperado
+        roas_a = _valor(a["estrategia"], "icp_comportamento.expected_roas", 0)
+        roas_b = _valor(b["estrategia"], "icp_comportamento.expected_roas", 0)
+        if roas_a != roas_b:
+            return a if roas_a > roas_b else b
 
         return None  # empate real
\ No newline at end of file
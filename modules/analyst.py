@@ -1,5 +1,7 @@
 import pandas as pd
 
+COLUNAS_SEGMENTO = ['age_range', 'gender', 'linhas', 'spend', 'revenue', 'clicks', 'impressions', 'conversions']
+
 def processar_e_achar_padroes(df: pd.DataFrame) -> dict:
     """
     Analisa o DataFrame para encontrar o segmento demográfico com melhor ROAS.
@@ -26,6 +28,7 @@ def processar_e_achar_padroes(df: pd.DataFrame) -> dict:
         'impressions': 'sum',
         'conversions': 'sum'
     }).reset_index()
+    analysis_group['linhas'] = df.groupby(group_cols).size().to_numpy()
 
     # 3. Feature Engineering no Grupo (Matemática Correta)
     # Calcula ROAS Global do grupo (Evita média das médias)
@@ -86,6 +89,9 @@ def processar_e_achar_padroes(df: pd.DataFrame) -> dict:
             "total_conversions": int(best_segment['conversions'])
         },
         
+        # Somas de todos os segmentos (persistidas em segment_metrics)
+        "segmentos": analysis_group[COLUNAS_SEGMENTO].to_dict("records"),
+
         # Texto para o Prompt do LLM (Strategist)
         "insight_text": (
             f"O segmento {best_segment['gender']} de {best_segment['age_range']} "
@@ -93,4 +99,4 @@ def processar_e_achar_padroes(df: pd.DataFrame) -> dict:
             f"e Taxa de Conversão de {round(best_segment['cvr']*100, 1)}%."
         )
     }
-    return resumo_padroes
\ No newline at end of file
+    return resumo_padroes
@@ -1,4 +1,8 @@
-from modules.persistence import SessionLocal, CampaignStrategy
+from datetime import timedelta
+import numpy as np
+from sqlalchemy import select, update, func, case, cast, Numeric
+from config import Config
+from modules.persistence import SessionLocal, CampaignStrategy, Lead, JobWatermark
 
 # É necessário atualizações para ser utilizado com dados reais!
 class FeedbackAgent:
@@ -7,6 +11,10 @@ class FeedbackAgent:
     Simula resultados reais para fechar o learning loop.
     """
 
+    TAXA_CONVERSAO_LEADS = 0.3  # fração dos leads que converte na simulação
+    PERCENTIS_SIMULACAO = (5, 50, 95)
+    BLOCO_SIMULACAO = 1000  # estratégias por bloco de amostragem (limita memória)
+
     @staticmethod
     def gerar_feedback_simulado(strategy_id: int) -> dict:
         db = SessionLocal()
@@ -27,7 +35,7 @@ class FeedbackAgent:
 
             # --- Simulação controlada ---
             total_leads = max(int(click_volume * (conversion_rate / 100)), 1)
-            total_conversoes = int(total_leads * 0.3)
+            total_conversoes = int(total_leads * FeedbackAgent.TAXA_CONVERSAO_LEADS)
 
             custo_total = round(
                 total_leads * (10 / max(expected_roas, 0.1)),
@@ -75,3 +83,205 @@ class FeedbackAgent:
 
         finally:
             db.close()
+
+    @staticmethod
+    def _amostrar_bloco(roas, cvr, clicks, n_amostras: int, rng) -> dict:
+        """
+        Sorteia n_amostras resultados por estratégia, vetorizado em NumPy.
+        Cada argumento é um array com uma posição por estratégia.
+        Retorna matrizes (estratégias x amostras).
+        """
+
+        shape = (len(roas), n_amostras)
+
+        # Volume de cliques ~ Poisson em torno do observado
+        cliques = rng.poisson(np.maximum(clicks, 0)[:, None], size=shape)
+
+        # Leads ~ Binomial(cliques, cvr) (mínimo de 1, como na simulação determinística)
+        p_lead = np.clip(cvr / 100, 0, 1)[:, None]
+        leads = np.maximum(rng.binomial(cliques, p_lead), 1)
+
+        conversoes = rng.binomial(leads, FeedbackAgent.TAXA_CONVERSAO_LEADS)
+
+        # Custo por lead ~ LogNormal com mediana 10 / ROAS
+        cpl_base = (10 / np.maximum(roas, 0.1))[:, None]
+        custo_medio_lead = cpl_base * rng.lognormal(0.0, 0.25, size=shape)
+
+        return {
+            "total_leads": leads,
+            "taxa_conversao": conversoes / leads * 100,
+            "custo_medio_lead": custo_medio_lead
+        }
+
+    @staticmethod
+    def simular_feedback_lote(strategy_ids: list, n_amostras: int = 5000, seed: int = None) -> dict:
+        """
+        Versão Monte Carlo em lote do gerar_feedback_simulado.
+        Carrega todas as estratégias em uma consulta, sorteia n_amostras resultados
+        por estratégia e grava média + bandas de percentis em um único bulk update.
+        """
+
+        db = SessionLocal()
+
+        try:
+            linhas = db.execute(
+                select(CampaignStrategy.id, CampaignStrategy.icp_comportamento)
+                .where(CampaignStrategy.id.in_(strategy_ids))
+            ).all()
+
+            if not linhas:
+                raise ValueError("Nenhuma strategy encontrada.")
+
+            comportamentos = [linha.icp_comportamento or {} for linha in linhas]
+
+            ids = [linha.id for linha in linhas]
+            roas = np.array([c.get("expected_roas", 1) for c in comportamentos], dtype=float)
+            cvr = np.array([c.get("conversion_rate", 1) for c in comportamentos], dtype=float)
+            clicks = np.array([c.get("click_volume", 10) for c in comportamentos], dtype=float)
+
+            rng = np.random.default_rng(seed)
+            registros = []
+            resultados = {}
+
+            for inicio in range(0, len(ids), FeedbackAgent.BLOCO_SIMULACAO):
+                fatia = slice(inicio, inicio + FeedbackAgent.BLOCO_SIMULACAO)
+                amostras = FeedbackAgent._amostrar_bloco(
+                    roas[fatia], cvr[fatia], clicks[fatia], n_amostras, rng
+                )
+
+                medias = {campo: valores.mean(axis=1) for campo, valores in amostras.items()}
+                percentis = {
+                    campo: np.percentile(valores, FeedbackAgent.PERCENTIS_SIMULACAO, axis=1)
+                    for campo, valores in amostras.items()
+                }
+
+                for i, strategy_id in enumerate(ids[fatia]):
+                    bandas = {
+                        campo: {
+                            f"p{p}": round(float(percentis[campo][j, i]), 2)
+                            for j, p in enumerate(FeedbackAgent.PERCENTIS_SIMULACAO)
+                        }
+                        for campo in amostras
+                    }
+                    taxa_conversao = float(medias["taxa_conversao"][i])
+
+                    registros.append({
+                        "id": strategy_id,
+                        "total_leads": int(round(medias["total_leads"][i])),
+                        "taxa_resposta": round(taxa_conversao / 100, 4),
+                        "taxa_conversao": round(taxa_conversao, 2),
+                        "custo_medio_lead": round(float(medias["custo_medio_lead"][i]), 2),
+                        "feedback_bandas": {"n_amostras": n_amostras, **bandas},
+                        "status": "SIMULATED_FEEDBACK"
+                    })
+                    resultados[strategy_id] = bandas
+
+            # Bulk UPDATE por chave primária (executemany)
+            db.execute(update(CampaignStrategy), registros)
+            db.commit()
+
+            return {
+                "status": "success",
+                "estrategias_simuladas": len(registros),
+                "n_amostras": n_amostras,
+                "feedback_simulado": resultados
+            }
+
+        except Exception as e:
+            db.rollback()
+            return {
+                "status": "error",
+                "reason": str(e)
+            }
+
+        finally:
+            db.close()
+
+    JOB_AGREGACAO_LEADS = "feedback_leads"
+
+    @staticmethod
+    def agregar_feedback_leads() -> dict:
+        """
+        Recalcula o feedback agregado das estratégias a partir da tabela 'leads'
+        (dados reais da APP B) com um único UPDATE ... FROM (SELECT ... GROUP BY).
+        Incremental: só estratégias com leads interagidos após a última marca d'água,
+        relendo uma janela de segurança (Config.FEEDBACK_WATERMARK_OVERLAP_MINUTES)
+        antes dela para pegar leads gravados com atraso. Reprocessar a janela é
+        seguro: as taxas são sempre recalculadas sobre todos os leads da estratégia.
+        """
+
+        db = SessionLocal()
+
+        try:
+            marca = db.get(JobWatermark, FeedbackAgent.JOB_AGREGACAO_LEADS)
+            desde = marca.watermark if marca else None
+
+            filtro_novos = Lead.last_interaction_at.isnot(None)
+            if desde is not None:
+                sobreposicao = timedelta(minutes=Config.FEEDBACK_WATERMARK_OVERLAP_MINUTES)
+                filtro_novos = Lead.last_interaction_at > desde - sobreposicao
+
+            nova_marca = db.execute(
+                select(func.max(Lead.last_interaction_at)).where(filtro_novos)
+            ).scalar()
+
+            if nova_marca is None:
+                return {
+                    "status": "success",
+                    "estrategias_atualizadas": 0,
+                    "watermark": desde.isoformat() if desde else None
+                }
+
+            # Estratégias com interações na janela (desde - sobreposição, nova_marca]
+            afetadas = select(Lead.strategy_id).where(
+                filtro_novos,
+                Lead.last_interaction_at <= nova_marca
+            ).distinct()
+
+            # As taxas são razões: reagrega todos os leads das estratégias afetadas
+            agregado = select(
+                Lead.strategy_id.label("strategy_id"),
+                func.count(Lead.id).label("total_leads"),
+                func.avg(case((Lead.respondeu.is_(True), 1), else_=0)).label("resposta"),
+                func.avg(case((Lead.converteu.is_(True), 1), else_=0)).label("conversao")
+            ).where(
+                Lead.strategy_id.in_(afetadas)
+            ).group_by(Lead.strategy_id).subquery()
+
+            resultado = db.execute(
+                update(CampaignStrategy)
+                .where(CampaignStrategy.id == agregado.c.strategy_id)
+                .values(
+                    total_leads=agregado.c.total_leads,
+                    taxa_resposta=func.round(cast(agregado.c.resposta, Numeric), 4),
+                    taxa_conversao=func.round(cast(agregado.c.conversao * 100, Numeric), 2)
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+            # A janela de sobreposição pode não ter nada novo: a marca nunca recua
+            if desde is not None and desde > nova_marca:
+                nova_marca = desde
+
+            db.merge(JobWatermark(
+                job_name=FeedbackAgent.JOB_AGREGACAO_LEADS,
+                watermark=nova_marca
+            ))
+
+            db.commit()
+
+            return {
+                "status": "success",
+                "estrategias_atualizadas": resultado.rowcount,
+                "watermark": nova_marca.isoformat()
+            }
+
+        except Exception as e:
+            db.rollback()
+            return {
+                "status": "error",
+                "reason": str(e)
+            }
+
+        finally:
+            db.close()
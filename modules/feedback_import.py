@@ -0,0 +1,298 @@
+import hashlib
+import os
+import re
+import pandas as pd
+from sqlalchemy import select, update, insert, delete, func
+from modules.persistence import (
+    SessionLocal, CampaignStrategy, Lead, AdPerformance, AdPerformanceImport, AdPerformancePendente
+)
+
+# Nomes de coluna aceitos nas exportações (Meta Ads / Google Ads), já normalizados
+COLUNAS_EXPORTACAO = {
+    "campanha_externa_id": ["campaign_id", "campaign id", "id da campanha", "campanha_externa_id"],
+    "spend": ["spend", "amount spent", "valor usado", "cost", "custo"],
+    "clicks": ["clicks", "link clicks", "cliques", "cliques no link"],
+    "impressions": ["impressions", "impr.", "impressões"],
+    "resultados": ["results", "resultados", "leads", "conversions", "conversões"],
+}
+
+COLUNAS_NUMERICAS = ["spend", "clicks", "impressions", "resultados"]
+
+
+def _normalizar_coluna(nome: str) -> str:
+    # "Amount spent (BRL)" -> "amount spent"
+    return re.sub(r"\s*\(.*\)\s*$", "", str(nome)).strip().lower()
+
+
+def _mapear_colunas(cabecalho: list) -> dict:
+    """
+    Retorna {coluna_original: coluna_padrao} para as colunas reconhecidas.
+    """
+
+    mapa = {}
+    for original in cabecalho:
+        normalizada = _normalizar_coluna(original)
+        for padrao, aliases in COLUNAS_EXPORTACAO.items():
+            if normalizada in aliases and padrao not in mapa.values():
+                mapa[original] = padrao
+                break
+
+    if "campanha_externa_id" not in mapa.values():
+        raise ValueError("Exportação sem coluna de id de campanha.")
+
+    return mapa
+
+
+def _hash_arquivo(caminho: str) -> str:
+    sha = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _carregar_mapa_campanhas(db) -> pd.DataFrame:
+    """
+    campanha_externa_id -> strategy_id, a partir dos leads da APP B.
+    Uma campanha com leads de várias estratégias aparece uma vez por estratégia,
+    com `peso` = fração dos leads da campanha que veio de cada uma.
+    """
+
+    linhas = db.execute(
+        select(Lead.campanha_externa_id, Lead.strategy_id, func.count().label("leads"))
+        .where(Lead.campanha_externa_id.isnot(None), Lead.strategy_id.isnot(None))
+        .group_by(Lead.campanha_externa_id, Lead.strategy_id)
+    ).all()
+
+    mapa = pd.DataFrame(linhas, columns=["campanha_externa_id", "strategy_id", "leads"])
+    mapa["campanha_externa_id"] = mapa["campanha_externa_id"].astype(str)
+    mapa["peso"] = mapa["leads"] / mapa.groupby("campanha_externa_id")["leads"].transform("sum")
+    return mapa[["campanha_externa_id", "strategy_id", "peso"]]
+
+
+def _gravar_performance(db, registros: list):
+    """
+    Insere as linhas de AdPerformance e recalcula o custo médio por lead
+    acumulado (todos os arquivos importados) das estratégias afetadas.
+    """
+
+    if not registros:
+        return
+
+    db.execute(insert(AdPerformance), registros)
+
+    totais = select(
+        AdPerformance.strategy_id.label("strategy_id"),
+        (
+            func.sum(AdPerformance.spend) /
+            func.nullif(func.sum(AdPerformance.resultados), 0)
+        ).label("custo_medio_lead")
+    ).where(
+        AdPerformance.strategy_id.in_(sorted({r["strategy_id"] for r in registros}))
+    ).group_by(AdPerformance.strategy_id).subquery()
+
+    db.execute(
+        update(CampaignStrategy)
+        .where(
+            CampaignStrategy.id == totais.c.strategy_id,
+            totais.c.custo_medio_lead.isnot(None)
+        )
+        .values(custo_medio_lead=totais.c.custo_medio_lead)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _registros(import_id: int, strategy_id, linha) -> dict:
+    return {
+        "import_id": int(import_id),
+        "strategy_id": int(strategy_id),
+        "spend": float(linha.spend),
+        "clicks": int(round(linha.clicks)),
+        "impressions": int(round(linha.impressions)),
+        "resultados": int(round(linha.resultados))
+    }
+
+
+def _aplicar_pendentes(db, mapa_campanhas: pd.DataFrame) -> int:
+    """
+    Aplica a performance pendente das campanhas que já têm leads, com o mesmo
+    rateio por leads da importação normal. Retorna as campanhas aplicadas.
+    """
+
+    colunas = ["id", "import_id", "campanha_externa_id"] + COLUNAS_NUMERICAS
+    pendentes = pd.DataFrame(
+        db.execute(select(*(getattr(AdPerformancePendente, c) for c in colunas))).all(),
+        columns=colunas
+    )
+
+    cruzado = pendentes.merge(mapa_campanhas, on="campanha_externa_id", how="inner")
+    if cruzado.empty:
+        return 0
+
+    cruzado[COLUNAS_NUMERICAS] = cruzado[COLUNAS_NUMERICAS].mul(cruzado["peso"], axis=0)
+    agregado = cruzado.groupby(["import_id", "strategy_id"])[COLUNAS_NUMERICAS].sum()
+
+    _gravar_performance(db, [
+        _registros(import_id, strategy_id, linha)
+        for (import_id, strategy_id), linha in agregado.iterrows()
+    ])
+
+    aplicadas = [int(i) for i in cruzado["id"].unique()]
+    db.execute(delete(AdPerformancePendente).where(AdPerformancePendente.id.in_(aplicadas)))
+    return len(aplicadas)
+
+
+def aplicar_performance_pendente() -> dict:
+    """
+    Aplica, sem reimportar arquivos, a performance de campanhas que não tinham
+    leads quando o arquivo foi importado (importar_exportacao também faz isso).
+    """
+
+    db = SessionLocal()
+
+    try:
+        aplicadas = _aplicar_pendentes(db, _carregar_mapa_campanhas(db))
+        db.commit()
+        return {"status": "success", "campanhas_pendentes_aplicadas": aplicadas}
+
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "reason": str(e)
+        }
+
+    finally:
+        db.close()
+
+
+def importar_exportacao(caminho_csv: str, chunksize: int = 500_000) -> dict:
+    """
+    Importa um CSV de performance das plataformas de anúncio para o feedback.
+    Lê em chunks, cruza com as estratégias via campanha_externa_id (merge vetorizado),
+    grava os agregados por estratégia e recalcula o custo médio por lead.
+    Campanhas compartilhadas por várias estratégias têm as métricas rateadas
+    pela quantidade de leads de cada uma e são listadas no retorno.
+    Idempotente: um arquivo com o mesmo conteúdo só é aplicado uma vez. Linhas de
+    campanhas ainda sem leads ficam em ad_performance_pendente e são aplicadas
+    numa importação seguinte (inclusive do mesmo arquivo) ou por
+    aplicar_performance_pendente, quando os leads chegarem.
+    """
+
+    arquivo_hash = _hash_arquivo(caminho_csv)
+    db = SessionLocal()
+
+    try:
+        mapa_campanhas = _carregar_mapa_campanhas(db)
+        pendentes_aplicadas = _aplicar_pendentes(db, mapa_campanhas)
+
+        ja_importado = db.execute(
+            select(AdPerformanceImport.id).where(AdPerformanceImport.arquivo_hash == arquivo_hash)
+        ).scalar()
+
+        if ja_importado:
+            db.commit()
+            return {
+                "status": "skipped",
+                "reason": "Arquivo já importado.",
+                "import_id": ja_importado,
+                "campanhas_pendentes_aplicadas": pendentes_aplicadas
+            }
+
+        cabecalho = pd.read_csv(caminho_csv, nrows=0).columns.tolist()
+        mapa_colunas = _mapear_colunas(cabecalho)
+        compartilhadas = set(
+            mapa_campanhas.loc[mapa_campanhas["peso"] < 1, "campanha_externa_id"]
+        )
+
+        parciais = []
+        parciais_pendentes = []
+        linhas_lidas = 0
+        linhas_sem_estrategia = 0
+        campanhas_rateadas = set()
+
+        leitor = pd.read_csv(
+            caminho_csv,
+            usecols=list(mapa_colunas),
+            dtype={col: str for col, padrao in mapa_colunas.items() if padrao == "campanha_externa_id"},
+            chunksize=chunksize
+        )
+
+        for chunk in leitor:
+            chunk = chunk.rename(columns=mapa_colunas)
+
+            for col in COLUNAS_NUMERICAS:
+                if col in chunk.columns:
+                    chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0)
+                else:
+                    chunk[col] = 0
+
+            cruzado = chunk.merge(mapa_campanhas, on="campanha_externa_id", how="inner")
+            cruzado[COLUNAS_NUMERICAS] = cruzado[COLUNAS_NUMERICAS].mul(cruzado["peso"], axis=0)
+
+            linhas_lidas += len(chunk)
+            # O merge repete a linha para cada estratégia da campanha: conta sobre o chunk
+            mapeadas = chunk["campanha_externa_id"].isin(mapa_campanhas["campanha_externa_id"])
+            linhas_sem_estrategia += int((~mapeadas).sum())
+            campanhas_rateadas.update(compartilhadas.intersection(chunk["campanha_externa_id"]))
+
+            parciais.append(cruzado.groupby("strategy_id")[COLUNAS_NUMERICAS].sum())
+            parciais_pendentes.append(chunk[~mapeadas].groupby("campanha_externa_id")[COLUNAS_NUMERICAS].sum())
+
+        if parciais:
+            agregado = pd.concat(parciais).groupby(level=0).sum()
+        else:
+            agregado = pd.DataFrame(columns=COLUNAS_NUMERICAS)
+
+        importacao = AdPerformanceImport(
+            arquivo_hash=arquivo_hash,
+            arquivo_nome=os.path.basename(caminho_csv),
+            linhas_lidas=linhas_lidas,
+            linhas_sem_estrategia=linhas_sem_estrategia
+        )
+        db.add(importacao)
+        db.flush()
+
+        registros = [
+            _registros(importacao.id, strategy_id, linha)
+            for strategy_id, linha in agregado.iterrows()
+        ]
+        _gravar_performance(db, registros)
+
+        # Campanhas sem leads ainda: guardadas para aplicar quando os leads chegarem
+        pendentes = (
+            pd.concat(parciais_pendentes).groupby(level=0).sum()
+            if parciais_pendentes else pd.DataFrame(columns=COLUNAS_NUMERICAS)
+        )
+        if not pendentes.empty:
+            db.execute(insert(AdPerformancePendente), [
+                {
+                    "import_id": importacao.id,
+                    "campanha_externa_id": campanha,
+                    **{col: float(linha[col]) for col in COLUNAS_NUMERICAS}
+                }
+                for campanha, linha in pendentes.iterrows()
+            ])
+
+        db.commit()
+
+        return {
+            "status": "success",
+            "import_id": importacao.id,
+            "linhas_lidas": linhas_lidas,
+            "linhas_sem_estrategia": linhas_sem_estrategia,
+            "estrategias_atualizadas": len(registros),
+            "campanhas_rateadas": sorted(campanhas_rateadas),
+            "campanhas_pendentes": len(pendentes),
+            "campanhas_pendentes_aplicadas": pendentes_aplicadas
+        }
+
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "reason": str(e)
+        }
+
+    finally:
+        db.close()
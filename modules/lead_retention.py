@@ -0,0 +1,127 @@
+import gzip
+import os
+import re
+from datetime import datetime, timezone
+from sqlalchemy import text
+from config import Config
+from modules.persistence import (
+    engine, leads_is_partitioned, lead_partition_names, create_lead_partitions, _inicio_do_mes
+)
+
+PADRAO_PARTICAO = re.compile(r"^leads_p(\d{4})(\d{2})$")
+
+
+def listar_particoes_leads(conn) -> list:
+    """
+    Retorna as partições mensais de 'leads' como (nome, inicio_do_mes), em ordem cronológica.
+    A partição DEFAULT não entra: suas linhas são antes redistribuídas
+    (ver redistribuir_particao_default).
+    """
+
+    particoes = []
+    for nome in lead_partition_names(conn):
+        match = PADRAO_PARTICAO.match(nome)
+        if match:
+            inicio = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+            particoes.append((nome, inicio))
+
+    return sorted(particoes, key=lambda p: p[1])
+
+
+def redistribuir_particao_default(conn) -> list:
+    """
+    Cria as partições mensais dos meses que têm linhas na partição DEFAULT
+    (ex.: carga retroativa de histórico) e move essas linhas para elas,
+    para que entrem no ciclo normal de retenção.
+    """
+
+    meses = conn.execute(text(
+        "SELECT DISTINCT date_trunc('month', found_at AT TIME ZONE 'UTC') "
+        "FROM leads_default WHERE found_at IS NOT NULL"
+    )).scalars().all()
+
+    return create_lead_partitions(conn, [m.replace(tzinfo=timezone.utc) for m in meses])
+
+
+def _exportar_particao(nome: str, destino: str):
+    """
+    Copia a partição para CSV comprimido via COPY (streaming, sem passar pelo ORM).
+    Escreve em arquivo temporário e só renomeia após o fsync.
+    """
+
+    temporario = destino + ".tmp"
+    raw = engine.raw_connection()
+
+    try:
+        with gzip.open(temporario, "wt", encoding="utf-8", newline="") as f:
+            cursor = raw.cursor()
+            cursor.copy_expert(f"COPY (SELECT * FROM {nome}) TO STDOUT WITH CSV HEADER", f)
+            cursor.close()
+
+        with open(temporario, "rb") as f:
+            os.fsync(f.fileno())
+
+        os.replace(temporario, destino)
+
+    except Exception:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+    finally:
+        raw.close()
+
+
+def arquivar_particoes_antigas(meses_retencao: int = None, pasta_arquivo: str = None) -> dict:
+    """
+    Move partições de 'leads' mais antigas que a janela de retenção para
+    arquivos .csv.gz e remove-as do banco (DETACH + DROP).
+    Só descarta a partição depois que o arquivo foi gravado por completo.
+    """
+
+    meses_retencao = meses_retencao if meses_retencao is not None else Config.LEADS_RETENTION_MONTHS
+    pasta_arquivo = pasta_arquivo or Config.LEADS_ARCHIVE_DIR
+
+    if engine.dialect.name != "postgresql":
+        return {"status": "skipped", "reason": "Particionamento disponível apenas no PostgreSQL."}
+
+    with engine.begin() as conn:
+        if not leads_is_partitioned(conn):
+            return {"status": "skipped", "reason": "Tabela 'leads' não é particionada."}
+
+        redistribuidas = []
+        if "leads_default" in lead_partition_names(conn):
+            redistribuidas = redistribuir_particao_default(conn)
+
+        particoes = listar_particoes_leads(conn)
+
+    # Partições cujo mês terminou antes do início da janela de retenção
+    limite = _inicio_do_mes(datetime.now(timezone.utc), -meses_retencao)
+    expiradas = [nome for nome, inicio in particoes if _inicio_do_mes(inicio, 1) <= limite]
+
+    os.makedirs(pasta_arquivo, exist_ok=True)
+    arquivos = []
+
+    for nome in expiradas:
+        destino = os.path.join(pasta_arquivo, f"{nome}.csv.gz")
+
+        _exportar_particao(nome, destino)
+
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE leads DETACH PARTITION {nome}"))
+            conn.execute(text(f"DROP TABLE {nome}"))
+
+        print(f"📦 Partição {nome} arquivada em {destino}")
+        arquivos.append(destino)
+
+    return {
+        "status": "success",
+        "limite": limite.isoformat(),
+        "particoes_criadas_da_default": redistribuidas,
+        "particoes_arquivadas": expiradas,
+        "arquivos": arquivos
+    }
+
+
+if __name__ == "__main__":
+    print(arquivar_particoes_antigas())
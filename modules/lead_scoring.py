@@ -0,0 +1,160 @@
+import unicodedata
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, update
+from modules.persistence import SessionLocal, CampaignStrategy, Lead, POSTGRESQL
+
+# Peso do estágio do funil (NEW → QUEUED → SENT → FAILED → REPLIED → CONVERTED)
+PESOS_STATUS = {
+    "NEW": 0.1,
+    "QUEUED": 0.1,
+    "SENT": 0.2,
+    "FAILED": 0.0,
+    "REPLIED": 0.6,
+    "CONVERTED": 1.0
+}
+
+# Composição do score final (soma = 1.0)
+PESO_STATUS = 0.4
+PESO_RESPONDEU = 0.15
+PESO_CONVERTEU = 0.15
+PESO_ICP = 0.3  # dividido igualmente entre posicionamento, criativo e interesse
+
+COLUNAS_LEAD = [
+    "id", "found_at", "strategy_id", "interaction_status", "respondeu", "converteu",
+    "posicionamento", "criativo_tipo", "interesse_detectado"
+]
+
+
+def _normalizar(texto) -> str:
+    # "Vídeo " -> "video"
+    if not isinstance(texto, str):
+        return ""
+    sem_acento = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    return sem_acento.strip().lower()
+
+
+def _carregar_icps(db, strategy_ids: list) -> dict:
+    """
+    Termos normalizados do ICP de cada estratégia, por dimensão.
+    """
+
+    linhas = db.execute(
+        select(
+            CampaignStrategy.id,
+            CampaignStrategy.posicionamentos,
+            CampaignStrategy.criativo_tipo,
+            CampaignStrategy.icp_interesses
+        ).where(CampaignStrategy.id.in_(strategy_ids))
+    ).all()
+
+    return {
+        "posicionamento": {l.id: [_normalizar(p) for p in (l.posicionamentos or [])] for l in linhas},
+        "criativo_tipo": {l.id: [_normalizar(l.criativo_tipo)] if l.criativo_tipo else [] for l in linhas},
+        "interesse_detectado": {l.id: [_normalizar(i) for i in (l.icp_interesses or [])] for l in linhas},
+    }
+
+
+def _match_icp(df: pd.DataFrame, coluna: str, termos_por_estrategia: dict) -> np.ndarray:
+    """
+    1.0 quando o valor do lead aparece nos termos do ICP da estratégia (contém / contido).
+    A comparação textual roda só nos pares (estratégia, valor) distintos e volta ao chunk via merge.
+    """
+
+    pares = df[["strategy_id", coluna]].drop_duplicates()
+
+    pares["match"] = [
+        float(bool(valor) and any(valor in termo or termo in valor for termo in termos_por_estrategia.get(sid, []) if termo))
+        for sid, valor in zip(pares["strategy_id"], pares[coluna])
+    ]
+
+    return df[["strategy_id", coluna]].merge(pares, on=["strategy_id", coluna], how="left")["match"].to_numpy()
+
+
+def calcular_scores(df: pd.DataFrame, icps: dict) -> np.ndarray:
+    """
+    Score de qualidade (0 a 1) vetorizado para um chunk de leads.
+    """
+
+    status = df["interaction_status"].map(PESOS_STATUS).fillna(0.0).to_numpy()
+    respondeu = df["respondeu"].fillna(False).astype(bool).to_numpy()
+    converteu = df["converteu"].fillna(False).astype(bool).to_numpy()
+
+    normalizado = df[["strategy_id"]].copy()
+    for coluna in icps:
+        normalizado[coluna] = df[coluna].map(_normalizar)
+
+    match_icp = sum(_match_icp(normalizado, coluna, icps[coluna]) for coluna in icps) / len(icps)
+
+    score = (
+        PESO_STATUS * status +
+        PESO_RESPONDEU * respondeu +
+        PESO_CONVERTEU * converteu +
+        PESO_ICP * match_icp
+    )
+
+    return np.round(score, 4)
+
+
+def pontuar_leads(strategy_ids: list, chunk_size: int = 100_000) -> dict:
+    """
+    Calcula Lead.score_qualidade em lote para os leads das estratégias informadas.
+    Lê em chunks por paginação de chave (id), pontua vetorizado e grava com bulk update.
+    """
+
+    db = SessionLocal()
+
+    try:
+        icps = _carregar_icps(db, strategy_ids)
+        ultimo_id = 0
+        total = 0
+        chunks = 0
+
+        while True:
+            linhas = db.execute(
+                select(*[getattr(Lead, col) for col in COLUNAS_LEAD])
+                .where(Lead.strategy_id.in_(strategy_ids), Lead.id > ultimo_id)
+                .order_by(Lead.id)
+                .limit(chunk_size)
+            ).all()
+
+            if not linhas:
+                break
+
+            df = pd.DataFrame(linhas, columns=COLUNAS_LEAD)
+            scores = calcular_scores(df, icps)
+
+            # Bulk UPDATE por chave primária: no PostgreSQL (id, found_at) → poda de partição;
+            # nos demais a PK é só o id e found_at viraria um SET redundante
+            if POSTGRESQL:
+                valores = [
+                    {"id": int(lead_id), "found_at": found_at, "score_qualidade": float(score)}
+                    for lead_id, found_at, score in zip(df["id"], df["found_at"], scores)
+                ]
+            else:
+                valores = [
+                    {"id": int(lead_id), "score_qualidade": float(score)}
+                    for lead_id, score in zip(df["id"], scores)
+                ]
+            db.execute(update(Lead), valores)
+            db.commit()
+
+            ultimo_id = int(df["id"].iloc[-1])
+            total += len(df)
+            chunks += 1
+
+        return {
+            "status": "success",
+            "leads_pontuados": total,
+            "chunks": chunks
+        }
+
+    except Exception as e:
+        db.rollback()
+        return {
+            "status": "error",
+            "reason": str(e)
+        }
+
+    finally:
+        db.close()
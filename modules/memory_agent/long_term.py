@@ -1,76 +1,345 @@
 import json
 import os
-from collections import Counter
+import time
+from contextlib import contextmanager
+from modules.memory_agent.space_saving import SpaceSaving
 
-MEMORY_FILE = "data/long_term_memory.json"
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos
+    fcntl = None
+
+MEMORY_FILE = "data/long_term_memory.json"  # snapshot compactado
+MEMORY_LOG = "data/long_term_memory.log"    # eventos (append-only) desde o último snapshot
+COMPACT_EVERY = 100  # eventos no log antes de gerar um novo snapshot
+
+# Itens mantidos por contador de sucesso (top-k aproximado, tamanho constante)
+SKETCH_CAPACITY = {
+    "platform_success": 20,
+    "creative_success": 100,
+    "interest_success": 200
+}
+INSIGHTS_TOP_N = 10
 
 class LongTermMemory:
+    """
+    Memória persistente entre execuções.
+    Cada sucesso vira uma linha no log de eventos (append + fsync); o snapshot JSON
+    é regravado só na compactação, de forma atômica (arquivo temporário + rename).
+    Na inicialização carrega o snapshot e reaplica apenas os eventos posteriores a ele.
 
-    def __init__(self):
-        if not os.path.exists(MEMORY_FILE):
-            self.data = {
-                # Estatísticas Quantitativas (Novo)
-                "global_stats": {
-                    "total_executions": 0,
-                    "confidence_sum": 0.0  # Para calcular média
-                },
-                # Estatísticas Qualitativas (Existente)
-                "platform_success": Counter(),
-                "creative_success": Counter(),
-                "interest_success": Counter()
-            }
-            self._persist()
-        else:
-            with open(MEMORY_FILE, "r", encoding="utf-8") as f:
-                raw = json.load(f)
-                # Recarrega stats
-                self.data = {
-                    "global_stats": raw.get("global_stats", {"total_executions": 0, "confidence_sum": 0.0}),
-                    "platform_success": Counter(raw.get("platform_success", {})),
-                    "creative_success": Counter(raw.get("creative_success", {})),
-                    "interest_success": Counter(raw.get("interest_success", {}))
-                }
+    Vários processos podem compartilhar os mesmos arquivos: escritas e compactação
+    acontecem sob lock exclusivo (flock), e cada instância acompanha o log a partir
+    do último byte lido, aplicando só os eventos novos gravados por outros processos.
+    A primeira linha de cada log ({"base_seq": N}) identifica a geração do log,
+    para detectar que outro processo compactou.
+
+    Os contadores de sucesso são SpaceSaving de capacidade fixa, então o tamanho
+    do snapshot não cresce com a quantidade de interesses distintos gerados pela LLM.
+    """
+
+    def __init__(self, memory_file: str = MEMORY_FILE, log_file: str = MEMORY_LOG,
+                 compact_every: int = COMPACT_EVERY):
+        self.memory_file = memory_file
+        self.log_file = log_file
+        self.lock_file = memory_file + ".lock"
+        self.compact_every = compact_every
+
+        self.data = self._estado_vazio()
+        self.last_seq = 0          # último evento já refletido em self.data
+        self._eventos_no_log = 0
+        self._log_base = None      # geração do log acompanhado (base_seq do cabeçalho)
+        self._log_offset = 0       # bytes do log já aplicados
+        self._log_versao = None    # (inode, tamanho, mtime) visto na última leitura
+        self._insights_cache = None
+
+        # Contenção do lock (exposta para o teste de estresse)
+        self.lock_stats = {"acquisitions": 0, "wait_total_s": 0.0, "wait_max_s": 0.0}
+
+        with self._lock(exclusivo=True):
+            self._recarregar()
+            self._reparar_log()
+
+            if not os.path.exists(self.memory_file):
+                self._compactar()
+
+    @staticmethod
+    def _estado_vazio():
+        return {
+            # Estatísticas Quantitativas (Novo)
+            "global_stats": {
+                "total_executions": 0,
+                "confidence_sum": 0.0  # Para calcular média
+            },
+            # Estatísticas Qualitativas (Existente)
+            "platform_success": SpaceSaving(SKETCH_CAPACITY["platform_success"]),
+            "creative_success": SpaceSaving(SKETCH_CAPACITY["creative_success"]),
+            "interest_success": SpaceSaving(SKETCH_CAPACITY["interest_success"])
+        }
 
     def record_success(self, strategy, score_val: float):
         """
         Agora aceita score_val para atualizar a média histórica.
         """
-        # 1. Atualiza Estatísticas Numéricas
-        self.data["global_stats"]["total_executions"] += 1
-        self.data["global_stats"]["confidence_sum"] += score_val
+        with self._lock(exclusivo=True):
+            # Aplica o que outros processos gravaram antes de numerar o novo evento
+            self._sincronizar()
+            self._reparar_log()
 
-        # 2. Atualiza Preferências (Tags)
-        self.data["platform_success"][strategy.get("plataforma", "unknown")] += 1
-        self.data["creative_success"][strategy.get("criativo_tipo", "unknown")] += 1
+            evento = {
+                "seq": self.last_seq + 1,
+                "plataforma": strategy.get("plataforma", "unknown"),
+                "criativo_tipo": strategy.get("criativo_tipo", "unknown"),
+                "icp_interesses": list(strategy.get("icp_interesses", [])),
+                "score": score_val
+            }
 
-        for interest in strategy.get("icp_interesses", []):
-            self.data["interest_success"][interest] += 1
+            self._append_evento(evento)
+            self._aplicar_evento(evento)
 
-        self._persist()
+            if self._eventos_no_log >= self.compact_every:
+                self._compactar()
 
     def get_stats(self):
         """
         Retorna os números que o Orchestrator precisa.
         """
+        self.atualizar()
+
         stats = self.data["global_stats"]
         total = stats["total_executions"]
-        
+
         avg = 0.0
         if total > 0:
             avg = stats["confidence_sum"] / total
-            
+
         return {
             "total_executions": total,
             "historical_confidence_avg": avg
         }
 
-    def _persist(self):
-        with open(MEMORY_FILE, "w", encoding="utf-8") as f:
-            # Precisamos converter Counters para dicts normais para o JSON aceitar
-            output = {
-                "global_stats": self.data["global_stats"],
-                "platform_success": dict(self.data["platform_success"]),
-                "creative_success": dict(self.data["creative_success"]),
-                "interest_success": dict(self.data["interest_success"])
+    def get_insights(self):
+        """
+        Plataformas, criativos e interesses que mais aparecem em estratégias bem-sucedidas.
+        """
+        self.atualizar()
+
+        # Só reordena quando chegou evento novo
+        if self._insights_cache and self._insights_cache[0] == self.last_seq:
+            return self._insights_cache[1]
+
+        def _top(chave):
+            return [
+                {"valor": item, "sucessos": count}
+                for item, count in self.data[chave].top(INSIGHTS_TOP_N)
+            ]
+
+        insights = {
+            "top_plataformas": _top("platform_success"),
+            "top_criativos": _top("creative_success"),
+            "top_interesses": _top("interest_success")
+        }
+        self._insights_cache = (self.last_seq, insights)
+
+        return insights
+
+    def atualizar(self):
+        """
+        Incorpora atualizações de outros processos.
+        Custo de um stat quando o log não mudou.
+        """
+        if self._versao_log() != self._log_versao:
+            with self._lock(exclusivo=False):
+                self._sincronizar()
+
+    # --- Lock entre processos ---
+    @contextmanager
+    def _lock(self, exclusivo: bool):
+        if fcntl is None:
+            yield
+            return
+
+        with open(self.lock_file, "a") as f:
+            inicio = time.perf_counter()
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            espera = time.perf_counter() - inicio
+
+            self.lock_stats["acquisitions"] += 1
+            self.lock_stats["wait_total_s"] += espera
+            self.lock_stats["wait_max_s"] = max(self.lock_stats["wait_max_s"], espera)
+
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    # --- Leitura (snapshot + log) ---
+    def _versao_log(self):
+        try:
+            st = os.stat(self.log_file)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _ler_base_log(self):
+        """
+        base_seq do cabeçalho do log atual (None para log sem cabeçalho ou inexistente).
+        """
+        try:
+            with open(self.log_file, "rb") as f:
+                primeira = f.readline()
+        except FileNotFoundError:
+            return None
+
+        try:
+            return json.loads(primeira).get("base_seq")
+        except ValueError:
+            return None
+
+    def _sincronizar(self):
+        """
+        Deve ser chamada com o lock. Lê só o trecho novo do log; se o log é de
+        outra geração (compactação em outro processo), recarrega snapshot + log.
+        """
+        if self._ler_base_log() != self._log_base:
+            self._recarregar()
+            return
+
+        versao = self._versao_log()
+        tamanho = versao[1] if versao else 0
+
+        if tamanho < self._log_offset:
+            self._recarregar()
+        elif tamanho > self._log_offset:
+            self._replay_log()
+
+    def _recarregar(self):
+        self.data = self._estado_vazio()
+        self.last_seq = 0
+        self._eventos_no_log = 0
+        self._log_offset = 0
+
+        if os.path.exists(self.memory_file):
+            self._carregar_snapshot()
+
+        self._log_base = self._ler_base_log()
+        self._replay_log()
+
+    def _carregar_snapshot(self):
+        with open(self.memory_file, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+
+        # Recarrega stats
+        self.data = {
+            "global_stats": raw.get("global_stats", {"total_executions": 0, "confidence_sum": 0.0}),
+            **{
+                chave: SpaceSaving.from_dict(raw.get(chave), capacidade)
+                for chave, capacidade in SKETCH_CAPACITY.items()
             }
-            json.dump(output, f, indent=4, ensure_ascii=False)
\ No newline at end of file
+        }
+        self.last_seq = raw.get("last_seq", 0)
+
+    def _replay_log(self):
+        """
+        Reaplica os eventos do log a partir do último byte lido que ainda não estão no snapshot.
+        Uma linha incompleta no fim (queda no meio da escrita) não é consumida;
+        _reparar_log a remove quando há lock exclusivo.
+        """
+        if not os.path.exists(self.log_file):
+            self._log_versao = None
+            return
+
+        with open(self.log_file, "rb") as f:
+            f.seek(self._log_offset)
+
+            for linha in f:
+                if not linha.endswith(b"\n"):
+                    break
+
+                try:
+                    evento = json.loads(linha)
+                except ValueError:
+                    break
+
+                self._log_offset += len(linha)
+
+                if "seq" not in evento:  # cabeçalho
+                    continue
+
+                self._eventos_no_log += 1
+
+                # Eventos já compactados (queda entre snapshot e troca do log)
+                if evento["seq"] > self.last_seq:
+                    self._aplicar_evento(evento)
+
+        self._log_versao = self._versao_log()
+
+    def _aplicar_evento(self, evento: dict):
+        # 1. Atualiza Estatísticas Numéricas
+        self.data["global_stats"]["total_executions"] += 1
+        self.data["global_stats"]["confidence_sum"] += evento["score"]
+
+        # 2. Atualiza Preferências (Tags)
+        self.data["platform_success"].add(evento["plataforma"])
+        self.data["creative_success"].add(evento["criativo_tipo"])
+
+        for interest in evento["icp_interesses"]:
+            self.data["interest_success"].add(interest)
+
+        self.last_seq = evento["seq"]
+
+    # --- Escrita (requer lock exclusivo) ---
+    def _append_evento(self, evento: dict):
+        linha = (json.dumps(evento, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with open(self.log_file, "ab") as f:
+            f.write(linha)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._eventos_no_log += 1
+        self._log_offset += len(linha)
+        self._log_versao = self._versao_log()
+
+    def _reparar_log(self):
+        # Remove a linha incompleta no fim do log deixada por uma escrita interrompida
+        versao = self._versao_log()
+
+        if versao and versao[1] > self._log_offset:
+            with open(self.log_file, "r+b") as f:
+                f.truncate(self._log_offset)
+            self._log_versao = self._versao_log()
+
+    def _compactar(self):
+        """
+        Grava o snapshot atomicamente e troca o log por um novo, vazio,
+        com cabeçalho da nova geração.
+        Se cair entre os dois passos, os eventos restantes no log têm seq <= last_seq
+        e são ignorados no próximo replay.
+        """
+        output = {
+            "last_seq": self.last_seq,
+            "global_stats": self.data["global_stats"],
+            **{chave: self.data[chave].to_dict() for chave in SKETCH_CAPACITY}
+        }
+
+        self._gravar_atomico(self.memory_file, json.dumps(output, indent=4, ensure_ascii=False))
+
+        cabecalho = json.dumps({"base_seq": self.last_seq}) + "\n"
+        self._gravar_atomico(self.log_file, cabecalho)
+
+        self._eventos_no_log = 0
+        self._log_base = self.last_seq
+        self._log_offset = len(cabecalho.encode("utf-8"))
+        self._log_versao = self._versao_log()
+
+    @staticmethod
+    def _gravar_atomico(caminho: str, conteudo: str):
+        temporario = caminho + ".tmp"
+
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temporario, caminho)
@@ -27,16 +27,8 @@ class MemoryAgent:
         # 1. Busca dados históricos (LTM)
         ltm_stats = self.ltm.get_stats()
         
-        # 2. Busca dados recentes (STM)
-        # O STM guarda objetos completos de score, mas o Orchestrator quer uma lista de floats
-        # para fazer max() - min().
-        stm_data = self.stm.recent_scores # Isso é um deque de dicts
-        
-        # Transforma [{'confidence_score': 0.8}, ...] em [0.8, ...]
-        recent_confidences_list = [
-            item.get("confidence_score", 0.0) 
-            for item in stm_data
-        ]
+        # 2. Agregados recentes (STM), mantidos a cada escrita
+        stm = self.stm
 
         # 3. Retorna o pacote completo
         return {
@@ -46,8 +38,12 @@ class MemoryAgent:
             # Usado para decidir se confia no histórico (>= 0.85 ou >= 0.7)
             "historical_confidence_avg": ltm_stats["historical_confidence_avg"],
             
-            # Usado para calcular instabilidade (variacao > 0.15)
-            "recent_confidences": recent_confidences_list,
+            # Usado para calcular instabilidade (max - min > 0.15)
+            "recent_count": stm.count(),
+            "recent_mean": stm.mean(),
+            "recent_min": stm.min(),
+            "recent_max": stm.max(),
+            "recent_variance": stm.variance(),
             
             # (Opcional) Se precisar dos insights qualitativos para o prompt
             "insights": self.ltm.get_insights() if hasattr(self.ltm, "get_insights") else {}
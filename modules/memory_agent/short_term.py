@@ -1,29 +1,117 @@
 from collections import deque
 
+LIMITE_FALHA = 0.6  # confidence_score abaixo disso conta como falha recente
+
+
+class ScoreRecord:
+    """
+    O que a memória curta precisa de um score (sem a estratégia completa).
+    """
+    __slots__ = ("confidence_score", "risk_level", "num_flags")
+
+    def __init__(self, confidence_score: float, risk_level: str, num_flags: int):
+        self.confidence_score = confidence_score
+        self.risk_level = risk_level
+        self.num_flags = num_flags
+
+
+class ABRecord:
+    """
+    Resumo de um A/B test (sem as estratégias candidatas).
+    """
+    __slots__ = ("status", "winner_index", "winner_score", "num_candidatos")
+
+    def __init__(self, status: str, winner_index, winner_score, num_candidatos: int):
+        self.status = status
+        self.winner_index = winner_index
+        self.winner_score = winner_score
+        self.num_candidatos = num_candidatos
+
+
 class ShortTermMemory:
     """
     Memória volátil da execução atual.
+    Guarda registros compactos numa janela deslizante e mantém os agregados
+    (soma, soma dos quadrados, mínimo/máximo por deques monotônicas) a cada escrita,
+    então todas as consultas são O(1).
     """
 
     def __init__(self, max_size=10):
-        self.recent_strategies = deque(maxlen=max_size)
+        self.max_size = max_size
         self.recent_scores = deque(maxlen=max_size)
         self.recent_ab_results = deque(maxlen=max_size)
 
+        self._seq = 0            # posição do próximo score na sequência
+        self._soma = 0.0
+        self._soma_quadrados = 0.0
+        self._falhas = 0
+        self._minimos = deque()  # (seq, valor) com valores crescentes
+        self._maximos = deque()  # (seq, valor) com valores decrescentes
+
     def record_strategy(self, strategy, score):
-        self.recent_strategies.append(strategy)
-        self.recent_scores.append(score)
+        registro = ScoreRecord(
+            confidence_score=score.get("confidence_score", 0.0),
+            risk_level=score.get("risk_level"),
+            num_flags=len(score.get("flags", []))
+        )
+
+        # Remove da janela o registro que vai sair
+        if len(self.recent_scores) == self.max_size:
+            saindo = self.recent_scores[0].confidence_score
+            self._soma -= saindo
+            self._soma_quadrados -= saindo * saindo
+            self._falhas -= saindo < LIMITE_FALHA
+
+        valor = registro.confidence_score
+        self.recent_scores.append(registro)
+        self._soma += valor
+        self._soma_quadrados += valor * valor
+        self._falhas += valor < LIMITE_FALHA
+
+        inicio_janela = self._seq - self.max_size + 1
+
+        while self._minimos and self._minimos[-1][1] >= valor:
+            self._minimos.pop()
+        self._minimos.append((self._seq, valor))
+        while self._minimos[0][0] < inicio_janela:
+            self._minimos.popleft()
+
+        while self._maximos and self._maximos[-1][1] <= valor:
+            self._maximos.pop()
+        self._maximos.append((self._seq, valor))
+        while self._maximos[0][0] < inicio_janela:
+            self._maximos.popleft()
+
+        self._seq += 1
 
     def record_ab_result(self, ab_result):
-        self.recent_ab_results.append(ab_result)
+        self.recent_ab_results.append(ABRecord(
+            status=ab_result.get("status"),
+            winner_index=ab_result.get("winner_index"),
+            winner_score=ab_result.get("winner_score"),
+            num_candidatos=len(ab_result.get("resultados", []))
+        ))
+
+    def count(self) -> int:
+        return len(self.recent_scores)
+
+    def mean(self):
+        return self._soma / len(self.recent_scores) if self.recent_scores else None
+
+    def variance(self):
+        if not self.recent_scores:
+            return None
+        media = self.mean()
+        return max(self._soma_quadrados / len(self.recent_scores) - media * media, 0.0)
+
+    def min(self):
+        return self._minimos[0][1] if self._minimos else None
+
+    def max(self):
+        return self._maximos[0][1] if self._maximos else None
 
     def get_context(self):
         return {
-            "recent_avg_score": (
-                sum(s["confidence_score"] for s in self.recent_scores) / len(self.recent_scores)
-                if self.recent_scores else None
-            ),
-            "recent_failures": [
-                s for s in self.recent_scores if s["confidence_score"] < 0.6
-            ]
+            "recent_avg_score": self.mean(),
+            "recent_failures": self._falhas
         }
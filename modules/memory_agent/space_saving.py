@@ -0,0 +1,73 @@
+class SpaceSaving:
+    """
+    Contador top-k de memória limitada (algoritmo Space-Saving, Metwally et al.).
+    Mantém no máximo `capacidade` itens; ao chegar um item novo com a estrutura cheia,
+    ele substitui o de menor contagem e herda essa contagem como erro máximo.
+    Itens com frequência real acima de N / capacidade nunca são descartados.
+    """
+
+    def __init__(self, capacidade: int = 100):
+        self.capacidade = capacidade
+        self.counts = {}   # item -> contagem estimada (nunca subestima)
+        self.errors = {}   # item -> superestimação máxima
+
+    def add(self, item, count: int = 1):
+        if item in self.counts:
+            self.counts[item] += count
+            return
+
+        if len(self.counts) < self.capacidade:
+            self.counts[item] = count
+            self.errors[item] = 0
+            return
+
+        # Substitui o item de menor contagem
+        menor = min(self.counts, key=self.counts.get)
+        minimo = self.counts.pop(menor)
+        self.errors.pop(menor)
+
+        self.counts[item] = minimo + count
+        self.errors[item] = minimo
+
+    def __getitem__(self, item) -> int:
+        return self.counts.get(item, 0)
+
+    def __contains__(self, item) -> bool:
+        return item in self.counts
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def top(self, n: int = None) -> list:
+        """
+        [(item, contagem), ...] em ordem decrescente.
+        """
+        ordenado = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return ordenado if n is None else ordenado[:n]
+
+    def to_dict(self) -> dict:
+        return {
+            "capacidade": self.capacidade,
+            "itens": {item: [self.counts[item], self.errors[item]] for item in self.counts}
+        }
+
+    @classmethod
+    def from_dict(cls, raw: dict, capacidade: int = 100) -> "SpaceSaving":
+        """
+        Aceita o formato de to_dict ou o formato antigo ({item: contagem} de um Counter).
+        """
+        raw = raw or {}
+
+        if "itens" in raw:
+            sketch = cls(raw.get("capacidade", capacidade))
+            for item, (count, error) in raw["itens"].items():
+                sketch.counts[item] = count
+                sketch.errors[item] = error
+            return sketch
+
+        # Formato antigo (contagens exatas): mantém os maiores
+        sketch = cls(capacidade)
+        for item, count in sorted(raw.items(), key=lambda kv: kv[1], reverse=True)[:capacidade]:
+            sketch.counts[item] = count
+            sketch.errors[item] = 0
+        return sketch
@@ -1,7 +1,11 @@
+from config import Config
 from modules.strategist import gerar_estrategia_llm
 from modules.ab_agent import ABAgent
 from modules.score_agent import ScoreAgent
 from modules.memory_agent.memory_agent import MemoryAgent
+from modules.similarity_index import SimilarityIndex
+from modules.persistence import get_latest_approved_strategy, get_approved_strategy, segment_key
+from modules.tracing import span, incrementar
 
 
 class OrchestratorAgent:
@@ -10,11 +14,18 @@ class OrchestratorAgent:
     Controla o fluxo estratégico antes da persistência.
     """
 
+    METRICAS_REUSO = ("expected_roas", "conversion_rate", "click_volume")
+
     def __init__(self, plataforma: str, objetivo: str, confidence_threshold: float = 0.6):
         self.plataforma = plataforma
         self.objetivo = objetivo
         self.confidence_threshold = confidence_threshold
-        self.memory = MemoryAgent()
+        with span("memory_load"):
+            self.memory = MemoryAgent()
+
+        with span("similarity_index_load") as s:
+            self.indice_similaridade = SimilarityIndex.carregar()
+            s.set(rows=len(self.indice_similaridade))
 
     def executar_pipeline(self, insights: dict) -> dict:
         """
@@ -26,16 +37,56 @@ class OrchestratorAgent:
 
         # DECIDIR QUANTAS ESTRATÉGIAS GERAR
         num_variacoes = self._decidir_num_variacoes()
+
+        # REUSO (mesmo segmento vencedor com métricas estáveis → sem chamar a LLM)
+        reuso = self._tentar_reuso(insights, chamadas_evitadas=num_variacoes)
+        if reuso:
+            return reuso
+
         print(f"🧪 Gerando {num_variacoes} variações.")
 
-        estrategias = [
-            gerar_estrategia_llm(insights, plataforma=self.plataforma, objetivo=self.objetivo)
-            for _ in range(num_variacoes)
-        ]
+        estrategias = []
+        for variacao in range(num_variacoes):
+            with span("llm_generate", variacao=variacao):
+                estrategias.append(
+                    gerar_estrategia_llm(insights, plataforma=self.plataforma, objetivo=self.objetivo)
+                )
+
+        # FALLBACK DA LLM (resposta de erro do strategist): nunca segue para A/B, score ou persistência
+        falhas = sum(1 for e in estrategias if e.get("versao_modelo_llm") == "fallback")
+        if falhas:
+            estrategias = [e for e in estrategias if e.get("versao_modelo_llm") != "fallback"]
+            print(f"⚠️ {falhas} variação(ões) com falha na geração descartada(s).")
+
+        if not estrategias:
+            return self._bloqueio(
+                reason="LLM_FALLBACK",
+                falhas=falhas
+            )
+
+        # DEDUPLICAÇÃO (quase duplicatas entre si ou de estratégias já persistidas)
+        with span("dedup", rows=len(estrategias)):
+            estrategias, duplicadas = self.indice_similaridade.filtrar_duplicatas(estrategias)
+
+        if duplicadas:
+            print(f"♻️ {len(duplicadas)} variação(ões) quase duplicada(s) descartada(s).")
+
+        if not estrategias:
+            # Todas repetem algo já visto: se for uma estratégia aprovada, reaproveita
+            reuso = self._reusar_duplicata(insights, duplicadas)
+            if reuso:
+                return reuso
+
+            return self._bloqueio(
+                reason="DUPLICATE_STRATEGY",
+                duplicadas=duplicadas
+            )
 
         # A/B TEST
-        if num_variacoes > 1:
-            ab_result = ABAgent.comparar(estrategias)
+        if len(estrategias) > 1:
+            with span("ab_test", rows=len(estrategias)) as s:
+                ab_result = ABAgent.comparar(estrategias)
+                s.set(status=ab_result["status"])
 
             print(f"🧪 A/B Test | Status={ab_result['status']}")
 
@@ -68,7 +119,8 @@ class OrchestratorAgent:
             estrategia_final = estrategias[0]
 
         # SCORE DA ESTRATÉGIA
-        score = ScoreAgent.avaliar(estrategia_final)
+        with span("score", rows=1):
+            score = ScoreAgent.avaliar(estrategia_final)
 
         print("📊 Score calculado:", score)
 
@@ -117,7 +169,7 @@ class OrchestratorAgent:
 
         executions = context.get("executions_count", 0)
         historical_avg = context.get("historical_confidence_avg", 0.6)
-        recent = context.get("recent_confidences", [])
+        recent_count = context.get("recent_count", 0)
 
         # COLD START — pouca memória
         if executions < 3:
@@ -125,8 +177,8 @@ class OrchestratorAgent:
             return 2
 
         # Instabilidade recente
-        if len(recent) >= 3:
-            variacao = max(recent) - min(recent)
+        if recent_count >= 3:
+            variacao = context["recent_max"] - context["recent_min"]
 
             if variacao > 0.15:
                 print("📉 Instabilidade detectada → A/B defensivo")
@@ -146,6 +198,159 @@ class OrchestratorAgent:
         print("🚨 Baixa confiança → exploração reforçada")
         return 3
 
+    def _tentar_reuso(self, insights: dict, chamadas_evitadas: int):
+        """
+        Reaproveita a última estratégia aprovada da mesma plataforma, objetivo e
+        segmento quando o icp_comportamento novo está dentro de
+        Config.STRATEGY_REUSE_TOLERANCE das métricas com que ela foi gerada.
+        Retorna o resultado aprovado ou None.
+        """
+
+        tolerancia = Config.STRATEGY_REUSE_TOLERANCE
+        chave = segment_key(insights.get("icp_demografia"))
+
+        if tolerancia <= 0 or not chave:
+            return None
+
+        with span("reuse_lookup"):
+            anterior = get_latest_approved_strategy(self.plataforma, self.objetivo, chave)
+
+        if anterior is None:
+            return None
+
+        # Contra as métricas da geração: os refreshes de reusos anteriores não acumulam desvio
+        comportamento = insights.get("icp_comportamento") or {}
+        origem = anterior.icp_comportamento_origem or anterior.icp_comportamento or {}
+        desvio = self._desvio_relativo(origem, comportamento)
+
+        if desvio > tolerancia:
+            print(f"🔎 Estratégia #{anterior.id} do mesmo segmento fora da tolerância (desvio {desvio:.1%}).")
+            return None
+
+        resultado = self._reaproveitar(anterior, comportamento, chamadas_evitadas)
+        if resultado is None:
+            print(f"🔎 Estratégia #{anterior.id} reprovada com as métricas atuais → gerando novas.")
+            return None
+
+        print(
+            f"♻️ Reutilizando estratégia #{anterior.id} (desvio {desvio:.1%}) | "
+            f"{chamadas_evitadas} chamada(s) à LLM evitada(s), ~{resultado['tempo_economizado_s']:.1f}s economizados"
+        )
+        return resultado
+
+    def _reusar_duplicata(self, insights: dict, duplicadas: list):
+        """
+        Quando todas as variações geradas repetem estratégias já persistidas
+        (mesma plataforma, objetivo e segmento), reaproveita a mais parecida que
+        ainda estiver aprovada. Retorna o resultado aprovado ou None.
+        """
+
+        persistidas = [d for d in duplicadas if isinstance(d["duplicata_de"], int)]
+        if not persistidas:
+            return None
+
+        mais_parecida = max(persistidas, key=lambda d: d["similaridade"])
+
+        with span("reuse_lookup"):
+            anterior = get_approved_strategy(mais_parecida["duplicata_de"])
+
+        if anterior is None:
+            return None
+
+        # Outro público: reaproveitar gravaria as métricas deste segmento na estratégia de outro
+        if segment_key(anterior.icp_demografia) != segment_key(insights.get("icp_demografia")):
+            print(f"🔎 Estratégia #{anterior.id} é de outro segmento → não reutilizada.")
+            return None
+
+        # As chamadas à LLM já foram feitas: nada a contabilizar como evitado
+        resultado = self._reaproveitar(anterior, insights.get("icp_comportamento") or {}, chamadas_evitadas=0)
+        if resultado is None:
+            print(f"🔎 Estratégia #{anterior.id} reprovada com as métricas atuais.")
+            return None
+
+        print(
+            f"♻️ Variações repetem a estratégia #{anterior.id} "
+            f"(similaridade {mais_parecida['similaridade']:.0%}) → reutilizando."
+        )
+        resultado["duplicadas"] = duplicadas
+        return resultado
+
+    def _reaproveitar(self, anterior, comportamento: dict, chamadas_evitadas: int):
+        """
+        Resultado aprovado a partir de uma estratégia persistida, com as métricas
+        comportamentais atuais. None se ela não passar no score com essas métricas.
+        """
+
+        estrategia = {
+            "plataforma": anterior.plataforma,
+            "objetivo": anterior.objetivo,
+            "icp_demografia": anterior.icp_demografia,
+            "icp_comportamento": comportamento,
+            "perfil_alvo_descricao": anterior.perfil_alvo_descricao,
+            "icp_interesses": anterior.icp_interesses or [],
+            "mensagem_template": anterior.mensagem_template,
+            "palavras_chave": anterior.palavras_chave or [],
+            "criativo_tipo": anterior.criativo_tipo,
+            "posicionamentos": anterior.posicionamentos or [],
+            "racional_estrategico": anterior.racional_estrategico,
+            "versao_modelo_llm": anterior.versao_modelo_llm
+        }
+
+        # Métricas novas podem disparar regras do score: nesse caso não reaproveita
+        with span("score", rows=1):
+            score = ScoreAgent.avaliar(estrategia)
+
+        if score["confidence_score"] < self.confidence_threshold:
+            return None
+
+        tempo_economizado = chamadas_evitadas * Config.LLM_LATENCY_ESTIMATE_S
+        incrementar("precog_llm_calls_skipped_total", chamadas_evitadas)
+        incrementar("precog_llm_seconds_saved_total", tempo_economizado)
+
+        self.memory.record_execution(
+            strategy=estrategia,
+            score=score,
+            ab_result=None
+        )
+
+        estrategia["score_avaliacao"] = score
+        estrategia["status"] = "APPROVED_BY_ORCHESTRATOR"
+
+        return {
+            "status": "APPROVED",
+            "strategy": estrategia,
+            "score": score,
+            "ab_result": None,
+            "memory_context": self.memory.get_context(),
+            "reused_strategy_id": anterior.id,
+            "llm_calls_skipped": chamadas_evitadas,
+            "tempo_economizado_s": tempo_economizado
+        }
+
+    def _desvio_relativo(self, anterior: dict, atual: dict) -> float:
+        """
+        Maior variação relativa entre as métricas comportamentais
+        (infinito se alguma estiver ausente).
+        """
+
+        desvio = 0.0
+
+        for metrica in self.METRICAS_REUSO:
+            antes, depois = anterior.get(metrica), atual.get(metrica)
+
+            if antes is None or depois is None:
+                return float("inf")
+
+            if antes == depois:
+                continue
+
+            if antes == 0:
+                return float("inf")
+
+            desvio = max(desvio, abs(float(depois) - float(antes)) / abs(float(antes)))
+
+        return desvio
+
     def _bloqueio(self, reason: str, **extras) -> dict:
         """
         Retorno padrão de bloqueio.
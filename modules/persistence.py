@@ -1,10 +1,11 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text, JSON, DateTime, ForeignKey, Float, Boolean
+from sqlalchemy import create_engine, Column, Integer, String, Text, JSON, DateTime, ForeignKey, Float, Boolean, Index, Identity, text, insert, select, update, bindparam, inspect
 from sqlalchemy.orm import declarative_base, sessionmaker, relationship
 from sqlalchemy.sql import func
 from contextlib import contextmanager 
-from datetime import datetime
+from datetime import datetime, timezone
 from config import Config
+from modules import sql_monitor
 
 # --- 0. Configuração do Ambiente ---
 try:
@@ -18,6 +19,10 @@ except AttributeError as e:
 
 # --- 1. Configuração da Engine ---
 engine = create_engine(DATABASE_URL, echo=False, pool_pre_ping=True) # Engine para conexão com o banco de dados
+sql_monitor.instalar(engine) # Contagem de round-trips, queries lentas e repetidas (N+1)
+
+# Particionamento de 'leads' e chave composta só existem no PostgreSQL
+POSTGRESQL = engine.dialect.name == "postgresql"
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine) # Cada requisição/thread deve criar sua própria sessão.
 
@@ -31,6 +36,10 @@ class CampaignStrategy(Base):
     """
 
     __tablename__ = 'campaign_strategies'
+    __table_args__ = (
+        # Busca da última estratégia aprovada para reuso (get_latest_approved_strategy)
+        Index('ix_campaign_strategies_reuso', 'plataforma', 'objetivo', 'segmento_chave', 'data_criacao'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -43,6 +52,9 @@ class CampaignStrategy(Base):
     icp_demografia = Column(JSON)     # idade, genero, localizacao
     icp_interesses = Column(JSON)     # interesses, palavras-chave
     icp_comportamento = Column(JSON)  # engajamento esperado, sinais
+    # Métricas usadas na geração: o reuso mede o desvio contra elas (refresh não altera)
+    icp_comportamento_origem = Column(JSON, nullable=True)
+    segmento_chave = Column(String, nullable=True, index=True)  # age_range|gender|location (ver segment_key)
 
     # OUTPUT DO LLM
     perfil_alvo_descricao = Column(Text)
@@ -63,6 +75,7 @@ class CampaignStrategy(Base):
     taxa_resposta = Column(Float, default=0.0)
     taxa_conversao = Column(Float, default=0.0)
     custo_medio_lead = Column(Float, default=0.0)
+    feedback_bandas = Column(JSON, nullable=True)  # percentis da simulação Monte Carlo
 
     data_criacao = Column(DateTime(timezone=True), server_default=func.now())
     ultima_atualizacao = Column(DateTime(timezone=True), onupdate=func.now())
@@ -78,8 +91,17 @@ class Lead(Base):
     """
 
     __tablename__ = 'leads'
+    __table_args__ = (
+        # Consultas da APP B por estratégia + status (fila de abordagem, relatórios)
+        Index('ix_leads_strategy_status', 'strategy_id', 'interaction_status'),
+        Index('ix_leads_found_at', 'found_at'),
+        # No PostgreSQL a tabela é particionada por mês (ver ensure_lead_partitions)
+        {'postgresql_partition_by': 'RANGE (found_at)'},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    # No PostgreSQL a chave de partição precisa fazer parte da PK: (id, found_at).
+    # Nos demais bancos a PK é só o id, gerado pelo próprio banco.
+    id = Column(Integer, Identity(), primary_key=True, index=True)
 
     # Estratégia que originou o lead
     strategy_id = Column(Integer, ForeignKey('campaign_strategies.id'))
@@ -88,7 +110,7 @@ class Lead(Base):
     # Origem
     plataforma = Column(String)  # instagram, tiktok
     fonte = Column(String)       # ads, organico, scraping
-    campanha_externa_id = Column(String)  # id da campanha na plataforma
+    campanha_externa_id = Column(String, index=True)  # id da campanha na plataforma
 
     # Identificação mínima (permitida)
     username = Column(String, index=True)
@@ -111,10 +133,119 @@ class Lead(Base):
     score_qualidade = Column(Float)  # scoring interno (opcional)
 
     # TIMESTAMPS
-    found_at = Column(DateTime(timezone=True), server_default=func.now())
+    found_at = Column(DateTime(timezone=True), primary_key=POSTGRESQL, server_default=func.now())
     last_interaction_at = Column(DateTime(timezone=True), nullable=True)
 
 
+class AdPerformanceImport(Base):
+    """
+    Arquivo de exportação de performance (Meta/Google) já importado.
+    O hash do conteúdo garante que cada arquivo seja aplicado uma única vez.
+    """
+
+    __tablename__ = 'ad_performance_imports'
+
+    id = Column(Integer, primary_key=True, index=True)
+    arquivo_hash = Column(String, nullable=False, unique=True)
+    arquivo_nome = Column(String)
+    linhas_lidas = Column(Integer, default=0)
+    linhas_sem_estrategia = Column(Integer, default=0)
+    importado_em = Column(DateTime(timezone=True), server_default=func.now())
+
+    linhas = relationship("AdPerformance", back_populates="importacao")
+
+
+class AdPerformance(Base):
+    """
+    Performance real agregada por estratégia dentro de um arquivo importado.
+    """
+
+    __tablename__ = 'ad_performance'
+
+    id = Column(Integer, primary_key=True, index=True)
+    import_id = Column(Integer, ForeignKey('ad_performance_imports.id'), nullable=False, index=True)
+    strategy_id = Column(Integer, ForeignKey('campaign_strategies.id'), nullable=False, index=True)
+
+    spend = Column(Float, default=0.0)
+    clicks = Column(Integer, default=0)
+    impressions = Column(Integer, default=0)
+    resultados = Column(Integer, default=0)  # leads/conversões reportados pela plataforma
+
+    importacao = relationship("AdPerformanceImport", back_populates="linhas")
+
+
+class AdPerformancePendente(Base):
+    """
+    Performance de campanhas ainda sem leads (sem estratégia conhecida) num arquivo
+    importado, agregada por campanha. Aplicada em AdPerformance quando os leads
+    da campanha chegarem (ver feedback_import.aplicar_performance_pendente).
+    """
+
+    __tablename__ = 'ad_performance_pendente'
+
+    id = Column(Integer, primary_key=True, index=True)
+    import_id = Column(Integer, ForeignKey('ad_performance_imports.id'), nullable=False, index=True)
+    campanha_externa_id = Column(String, nullable=False, index=True)
+
+    spend = Column(Float, default=0.0)
+    clicks = Column(Float, default=0.0)
+    impressions = Column(Float, default=0.0)
+    resultados = Column(Float, default=0.0)
+
+
+class JobWatermark(Base):
+    """
+    Marca d'água de jobs incrementais.
+    Guarda até onde cada job já processou, para a próxima execução continuar dali.
+    """
+
+    __tablename__ = 'job_watermarks'
+
+    job_name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    ultima_atualizacao = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+class SegmentMetric(Base):
+    """
+    Agregados por segmento de cada execução do analista (cubo compacto).
+    Guarda somas, não razões: ROAS/CVR de qualquer janela de tempo saem de
+    sum(revenue) / sum(spend) sem reler os CSVs brutos.
+    """
+
+    __tablename__ = 'segment_metrics'
+    __table_args__ = (
+        Index('ix_segment_metrics_run_at', 'run_at'),
+        # Histórico de um segmento numa janela de tempo
+        Index('ix_segment_metrics_segmento_run_at', 'age_range', 'gender', 'run_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String, nullable=False, index=True)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+
+    # Dimensões do segmento (mesmo agrupamento do analyst)
+    age_range = Column(String, nullable=False)
+    gender = Column(String, nullable=False)
+
+    # Somas do segmento na execução
+    linhas = Column(Integer, default=0)
+    spend = Column(Float, default=0.0)
+    revenue = Column(Float, default=0.0)
+    clicks = Column(Integer, default=0)
+    impressions = Column(Integer, default=0)
+    conversions = Column(Integer, default=0)
+
+
+# Colunas incluídas depois da criação original das tabelas: upgrade_schema as
+# adiciona (sempre anuláveis) em bancos que já existiam
+COLUNAS_ADICIONADAS = [
+    CampaignStrategy.__table__.c.segmento_chave,
+    CampaignStrategy.__table__.c.feedback_bandas,
+    CampaignStrategy.__table__.c.icp_comportamento_origem,
+]
+
+
 # --- 3. Funções Utilitárias de Banco ---
 def init_db():
     """
@@ -124,12 +255,246 @@ def init_db():
 
     try:
         Base.metadata.create_all(bind=engine)
+        upgrade_schema()
+        ensure_lead_partitions()
     except Exception as e:
         raise RuntimeError(
             "❌ [Persistence] Falha ao inicializar o banco de dados."
         ) from e
 
 
+def upgrade_schema():
+    """
+    Atualiza bancos criados por versões anteriores (create_all não altera
+    tabelas que já existem). Idempotente: pode rodar a cada inicialização.
+    """
+
+    with engine.begin() as conn:
+        if POSTGRESQL and not leads_is_partitioned(conn):
+            migrar_leads_para_particionada(conn)
+
+        # Reflexão de todas as tabelas em uma consulta por tipo de objeto
+        inspetor = inspect(conn)
+        todas_colunas = inspetor.get_multi_columns()
+        todos_indices = inspetor.get_multi_indexes()
+
+        # Colunas novas em tabelas antigas (SQLite não aceita ADD COLUMN IF NOT EXISTS)
+        adicionadas = {}
+        for coluna in COLUNAS_ADICIONADAS:
+            tabela = coluna.table.name
+            existentes = {c["name"] for c in todas_colunas.get((None, tabela), [])}
+            if existentes and coluna.name not in existentes:
+                tipo = coluna.type.compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f"ALTER TABLE {tabela} ADD COLUMN {coluna.name} {tipo}")
+                adicionadas.setdefault(tabela, set()).add(coluna.name)
+                print(f"🔧 [Persistence] Coluna {tabela}.{coluna.name} adicionada ao banco existente.")
+
+        estrategias_novas = adicionadas.get(CampaignStrategy.__tablename__, set())
+        if "segmento_chave" in estrategias_novas:
+            preencher_segmento_chave(conn)
+        if "icp_comportamento_origem" in estrategias_novas:
+            # Melhor aproximação disponível: as métricas atuais de cada estratégia
+            tabela = CampaignStrategy.__table__
+            conn.execute(
+                update(tabela)
+                .where(tabela.c.icp_comportamento_origem.is_(None))
+                .values(icp_comportamento_origem=tabela.c.icp_comportamento)
+            )
+
+        # Índices novos em tabelas antigas (só os que têm todas as colunas no banco)
+        for tabela in Base.metadata.sorted_tables:
+            colunas = {c["name"] for c in todas_colunas.get((None, tabela.name), [])}
+            colunas |= adicionadas.get(tabela.name, set())
+            indices = {i["name"] for i in todos_indices.get((None, tabela.name), [])}
+            for indice in tabela.indexes:
+                if indice.name not in indices and {c.name for c in indice.columns} <= colunas:
+                    indice.create(conn)
+
+
+def preencher_segmento_chave(conn) -> int:
+    """
+    Calcula segmento_chave (a partir de icp_demografia) das estratégias gravadas
+    antes da coluna existir, para que entrem no reuso. Retorna as linhas atualizadas.
+    """
+
+    tabela = CampaignStrategy.__table__
+    linhas = conn.execute(
+        select(tabela.c.id, tabela.c.icp_demografia).where(tabela.c.segmento_chave.is_(None))
+    ).all()
+
+    valores = [
+        {"b_id": linha.id, "b_chave": segment_key(linha.icp_demografia)}
+        for linha in linhas
+        if segment_key(linha.icp_demografia)
+    ]
+
+    if valores:
+        # Um único executemany para todas as linhas
+        conn.execute(
+            update(tabela)
+            .where(tabela.c.id == bindparam("b_id"))
+            .values(segmento_chave=bindparam("b_chave")),
+            valores
+        )
+        print(f"🔧 [Persistence] segmento_chave preenchido em {len(valores)} estratégia(s) existente(s).")
+
+    return len(valores)
+
+
+def _inicio_do_mes(referencia: datetime, deslocamento: int = 0) -> datetime:
+    """
+    Primeiro instante (UTC) do mês de referência deslocado em N meses.
+    """
+
+    indice = referencia.year * 12 + (referencia.month - 1) + deslocamento
+    return datetime(indice // 12, indice % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def lead_partition_name(inicio_mes: datetime) -> str:
+    return f"leads_p{inicio_mes.strftime('%Y%m')}"
+
+
+def leads_is_partitioned(conn) -> bool:
+    """
+    Instalações antigas podem ter a tabela 'leads' criada antes do particionamento
+    (create_all não altera tabelas existentes).
+    """
+
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('leads')"
+    )).first() is not None
+
+
+def lead_partition_names(conn) -> list:
+    """
+    Nomes de todas as partições de 'leads' (mensais e DEFAULT).
+    """
+
+    return conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('leads')"
+    )).scalars().all()
+
+
+def create_lead_partitions(conn, meses: list) -> list:
+    """
+    Cria as partições mensais que faltam para os meses informados (início do mês, UTC).
+    Linhas desses meses que já estavam na partição DEFAULT são movidas para as
+    novas partições: o PostgreSQL recusa criar a partição enquanto a DEFAULT
+    tiver linhas da faixa. Retorna os nomes das partições criadas.
+    """
+
+    existentes = set(lead_partition_names(conn))
+    faltantes = sorted({m for m in meses if lead_partition_name(m) not in existentes})
+
+    if not faltantes:
+        return []
+
+    faixas = [(inicio, _inicio_do_mes(inicio, 1)) for inicio in faltantes]
+    condicao = " OR ".join(f"(found_at >= :inicio_{n} AND found_at < :fim_{n})" for n in range(len(faixas)))
+    parametros = {}
+    for n, (inicio, fim) in enumerate(faixas):
+        parametros[f"inicio_{n}"] = inicio
+        parametros[f"fim_{n}"] = fim
+
+    mover = "leads_default" in existentes and conn.execute(
+        text(f"SELECT 1 FROM leads_default WHERE {condicao} LIMIT 1"), parametros
+    ).first() is not None
+
+    if mover:
+        conn.execute(text("ALTER TABLE leads DETACH PARTITION leads_default"))
+
+    for inicio, fim in faixas:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {lead_partition_name(inicio)} "
+            f"PARTITION OF leads FOR VALUES "
+            f"FROM ('{inicio.isoformat()}') TO ('{fim.isoformat()}')"
+        ))
+
+    if mover:
+        # Com a DEFAULT desanexada, o INSERT roteia as linhas para as partições novas
+        conn.execute(text(f"INSERT INTO leads SELECT * FROM leads_default WHERE {condicao}"), parametros)
+        conn.execute(text(f"DELETE FROM leads_default WHERE {condicao}"), parametros)
+        conn.execute(text("ALTER TABLE leads ATTACH PARTITION leads_default DEFAULT"))
+
+    return [lead_partition_name(inicio) for inicio in faltantes]
+
+
+def _meses_entre(inicio: datetime, fim: datetime) -> list:
+    meses, atual = [], _inicio_do_mes(inicio)
+    while atual <= fim:
+        meses.append(atual)
+        atual = _inicio_do_mes(atual, 1)
+    return meses
+
+
+def ensure_lead_partitions(meses_a_frente: int = 3):
+    """
+    Garante as partições mensais de 'leads' (mês atual + N meses à frente)
+    e a partição DEFAULT, que recebe linhas fora das faixas criadas.
+    Somente PostgreSQL; nos demais bancos não faz nada.
+    """
+
+    if not POSTGRESQL:
+        return
+
+    with engine.begin() as conn:
+        agora = datetime.now(timezone.utc)
+        create_lead_partitions(conn, _meses_entre(agora, _inicio_do_mes(agora, meses_a_frente)))
+        conn.execute(text("CREATE TABLE IF NOT EXISTS leads_default PARTITION OF leads DEFAULT"))
+
+
+def migrar_leads_para_particionada(conn):
+    """
+    Converte uma tabela 'leads' comum (criada antes do particionamento) em
+    particionada por mês: renomeia a antiga, cria a nova pelo modelo, cria as
+    partições de todo o histórico, copia as linhas e remove a antiga.
+    Roda numa única transação (DDL é transacional no PostgreSQL): se falhar,
+    nada muda. Bloqueia 'leads' durante a cópia.
+    """
+
+    total = conn.execute(text("SELECT count(*) FROM leads")).scalar()
+    print(f"🔧 [Persistence] Migrando 'leads' para tabela particionada ({total} linhas)...")
+
+    legado = "leads_legado"
+    conn.execute(text(f"ALTER TABLE leads RENAME TO {legado}"))
+
+    # Índices (inclusive o da PK) e a sequência do id colidiriam com os da tabela nova
+    indices = conn.execute(
+        text("SELECT indexname FROM pg_indexes WHERE tablename = :tabela"), {"tabela": legado}
+    ).scalars().all()
+    for indice in indices:
+        conn.execute(text(f'ALTER INDEX "{indice}" RENAME TO "{indice}_legado"'))
+
+    sequencia = conn.execute(text(f"SELECT pg_get_serial_sequence('{legado}', 'id')")).scalar()
+    if sequencia:
+        conn.execute(text(f"ALTER SEQUENCE {sequencia} RENAME TO {legado}_id_seq"))
+
+    Lead.__table__.create(conn)
+
+    # Partições de todo o histórico até os próximos meses
+    agora = datetime.now(timezone.utc)
+    mais_antigo = conn.execute(text(f"SELECT min(found_at) FROM {legado}")).scalar() or agora
+    create_lead_partitions(conn, _meses_entre(mais_antigo, _inicio_do_mes(agora, 3)))
+    conn.execute(text("CREATE TABLE IF NOT EXISTS leads_default PARTITION OF leads DEFAULT"))
+
+    # found_at passa a ser NOT NULL (faz parte da PK)
+    colunas = [c.name for c in Lead.__table__.columns]
+    origem = ["COALESCE(found_at, now())" if c == "found_at" else c for c in colunas]
+    conn.execute(text(
+        f"INSERT INTO leads ({', '.join(colunas)}) SELECT {', '.join(origem)} FROM {legado}"
+    ))
+
+    # A identidade continua depois do maior id copiado
+    conn.execute(text(
+        "SELECT setval(pg_get_serial_sequence('leads', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM leads"
+    ))
+    conn.execute(text(f"DROP TABLE {legado}"))
+
+    print(f"✅ [Persistence] 'leads' particionada ({total} linhas copiadas).")
+
+
 @contextmanager
 def get_db_session():
     """
@@ -148,6 +513,23 @@ def get_db_session():
         db.close()
 
 # --- 4. Funções de Negócio (CRUD) ---
+# Estratégias persistidas e não rejeitadas: podem ser reaproveitadas
+STATUS_APROVADOS = ("PENDING", "SIMULATED_FEEDBACK")
+
+
+def segment_key(demografia: dict):
+    """
+    Chave estável do segmento demográfico (None se a demografia estiver vazia).
+    """
+
+    if not demografia:
+        return None
+
+    return "|".join(
+        str(demografia.get(campo) or "").strip().lower()
+        for campo in ("age_range", "gender", "location")
+    )
+
 def create_strategy_record(data: dict, name: str):
     """
     Persiste a estratégia.
@@ -163,6 +545,8 @@ def create_strategy_record(data: dict, name: str):
             icp_demografia=data.get("icp_demografia", {}),
             icp_interesses=data.get("icp_interesses", {}),
             icp_comportamento=data.get("icp_comportamento", {}),
+            icp_comportamento_origem=data.get("icp_comportamento", {}),
+            segmento_chave=segment_key(data.get("icp_demografia")),
             
             perfil_alvo_descricao=data.get("perfil_alvo_descricao"),
             mensagem_template=data.get("mensagem_template"),
@@ -181,4 +565,169 @@ def create_strategy_record(data: dict, name: str):
         session.refresh(new_strategy) # Puxa do banco o 'created_at' e confirma o ID
         session.expunge(new_strategy) # Desconecta o objeto da sessão para ele sobreviver fora daqui
 
-        return new_strategy
\ No newline at end of file
+        return new_strategy
+
+
+def get_latest_approved_strategy(plataforma: str, objetivo: str, segmento_chave: str):
+    """
+    Estratégia aprovada mais recente para a mesma plataforma, objetivo e segmento
+    (ou None). Usa o índice ix_campaign_strategies_reuso.
+    """
+
+    consulta = (
+        select(CampaignStrategy)
+        .where(
+            CampaignStrategy.plataforma == plataforma,
+            CampaignStrategy.objetivo == objetivo,
+            CampaignStrategy.segmento_chave == segmento_chave,
+            CampaignStrategy.status.in_(STATUS_APROVADOS)
+        )
+        .order_by(CampaignStrategy.data_criacao.desc(), CampaignStrategy.id.desc())
+        .limit(1)
+    )
+
+    with get_db_session() as session:
+        strategy = session.execute(consulta).scalars().first()
+        if strategy is not None:
+            session.expunge(strategy)
+        return strategy
+
+
+def get_approved_strategy(strategy_id: int):
+    """
+    Estratégia pelo id, se ainda estiver aprovada (ou None).
+    """
+
+    consulta = select(CampaignStrategy).where(
+        CampaignStrategy.id == strategy_id,
+        CampaignStrategy.status.in_(STATUS_APROVADOS)
+    )
+
+    with get_db_session() as session:
+        strategy = session.execute(consulta).scalars().first()
+        if strategy is not None:
+            session.expunge(strategy)
+        return strategy
+
+
+def refresh_strategy_record(strategy_id: int, icp_comportamento: dict):
+    """
+    Atualiza as métricas observadas de uma estratégia reutilizada,
+    em vez de persistir uma cópia nova. icp_comportamento_origem fica intacto:
+    o desvio do reuso é sempre medido contra as métricas da geração.
+    """
+
+    with get_db_session() as session:
+        strategy = session.get(CampaignStrategy, strategy_id)
+        if strategy is None:
+            raise ValueError(f"Estratégia {strategy_id} não encontrada.")
+
+        strategy.icp_comportamento = icp_comportamento
+        session.flush()
+        session.refresh(strategy)
+        session.expunge(strategy)
+
+        return strategy
+
+
+def save_segment_metrics(run_id: str, segmentos: list, run_at: datetime = None) -> int:
+    """
+    Grava os agregados por segmento de uma execução num único INSERT em lote.
+    Retorna a quantidade de linhas gravadas.
+    """
+
+    if not segmentos:
+        return 0
+
+    run_at = run_at or datetime.now(timezone.utc)
+    colunas = ("age_range", "gender", "linhas", "spend", "revenue", "clicks", "impressions", "conversions")
+
+    linhas = [
+        {"run_id": run_id, "run_at": run_at, **{c: segmento.get(c) for c in colunas}}
+        for segmento in segmentos
+    ]
+
+    with get_db_session() as session:
+        session.execute(insert(SegmentMetric), linhas)
+
+    return len(linhas)
+
+
+def get_segment_history(age_range: str = None, gender: str = None, desde: datetime = None,
+                        ultimas_execucoes: int = None) -> list:
+    """
+    Histórico de agregados por segmento, do mais antigo para o mais recente.
+    Filtra por segmento e/ou data; ultimas_execucoes limita às N execuções mais recentes.
+    """
+
+    consulta = select(SegmentMetric).order_by(SegmentMetric.run_at, SegmentMetric.id)
+
+    if age_range is not None:
+        consulta = consulta.where(SegmentMetric.age_range == age_range)
+    if gender is not None:
+        consulta = consulta.where(SegmentMetric.gender == gender)
+    if desde is not None:
+        consulta = consulta.where(SegmentMetric.run_at >= desde)
+
+    if ultimas_execucoes:
+        # Instantes das N execuções mais recentes que atendem aos filtros
+        recentes = (
+            consulta.with_only_columns(SegmentMetric.run_at)
+            .distinct()
+            .order_by(None)
+            .order_by(SegmentMetric.run_at.desc())
+            .limit(ultimas_execucoes)
+            .subquery()
+        )
+        consulta = consulta.where(SegmentMetric.run_at.in_(select(recentes.c.run_at)))
+
+    with get_db_session() as session:
+        return [
+            {
+                "run_id": m.run_id,
+                "run_at": m.run_at,
+                "age_range": m.age_range,
+                "gender": m.gender,
+                "linhas": m.linhas,
+                "spend": m.spend,
+                "revenue": m.revenue,
+                "clicks": m.clicks,
+                "impressions": m.impressions,
+                "conversions": m.conversions
+            }
+            for m in session.execute(consulta).scalars()
+        ]
+
+
+def get_segment_baseline(age_range: str, gender: str, ultimas_execucoes: int = 20) -> dict:
+    """
+    ROAS e CVR históricos de um segmento a partir da tabela segment_metrics
+    (somas das últimas N execuções), sem reprocessar exportações antigas.
+    """
+
+    historico = get_segment_history(age_range=age_range, gender=gender, ultimas_execucoes=ultimas_execucoes)
+
+    if not historico:
+        return {
+            "status": "insufficient_data",
+            "reason": "Segmento sem execuções anteriores registradas."
+        }
+
+    spend = sum(h['spend'] or 0 for h in historico)
+    revenue = sum(h['revenue'] or 0 for h in historico)
+    clicks = sum(h['clicks'] or 0 for h in historico)
+    conversions = sum(h['conversions'] or 0 for h in historico)
+
+    return {
+        "status": "success",
+        "execucoes": len({h['run_id'] for h in historico}),
+        "roas": round(revenue / spend, 2) if spend > 0 else 0.0,
+        "conversion_rate": round(conversions / clicks * 100, 2) if clicks > 0 else 0.0,  # Em porcentagem
+        "serie_roas": [
+            {
+                "run_at": h['run_at'].isoformat(),
+                "roas": round(h['revenue'] / h['spend'], 2) if h['spend'] else 0.0
+            }
+            for h in historico
+        ]
+    }
@@ -1,81 +1,236 @@
+import json
+import re
 from datetime import datetime
+import numpy as np
+import pandas as pd
+from config import Config
+
+# ---------- REGRAS PADRÃO ----------
+# Avaliadas em ordem; cada regra que dispara subtrai sua penalidade do score (base 1.0).
+# Podem ser substituídas por um JSON em Config.SCORE_RULES_PATH
+# ({"regras": [...], "niveis_risco": [...]}).
+REGRAS_PADRAO = [
+    # 1. ICP DEMOGRÁFICO
+    {"tipo": "campos_obrigatorios", "flag": "icp_incompleto", "penalidade": 0.2,
+     "campos": ["icp_demografia.age_range", "icp_demografia.gender", "icp_demografia.location"]},
+
+    # 2. MÉTRICAS COMPORTAMENTAIS
+    {"tipo": "maior_que", "flag": "roas_irrealista", "penalidade": 0.15,
+     "campo": "icp_comportamento.expected_roas", "limite": 15, "padrao": 0},
+    {"tipo": "maior_que", "flag": "conversao_irrealista", "penalidade": 0.15,
+     "campo": "icp_comportamento.conversion_rate", "limite": 25, "padrao": 0},
+    {"tipo": "menor_que", "flag": "baixo_volume_cliques", "penalidade": 0.1,
+     "campo": "icp_comportamento.click_volume", "limite": 100, "padrao": 0},
+
+    # 3. CLAREZA DA MENSAGEM
+    {"tipo": "contem_algum", "flag": "mensagem_generica", "penalidade": 0.1,
+     "campo": "mensagem_template",
+     "termos": ["aproveite agora", "não perca", "o melhor para você", "solução ideal"]},
+
+    # 4. ALINHAMENTO COM PLATAFORMA
+    {"tipo": "contem_algum", "flag": "criativo_incompativel_plataforma", "penalidade": 0.1,
+     "campo": "criativo_tipo", "termos": ["video"], "quando": {"plataforma": "google_ads"}},
+    {"tipo": "contem_algum", "flag": "criativo_incompativel_plataforma", "penalidade": 0.1,
+     "campo": "criativo_tipo", "termos": ["search"], "quando": {"plataforma": "meta_ads"}},
+]
+
+# Do maior para o menor; abaixo do último limite o risco é "high"
+NIVEIS_RISCO_PADRAO = [
+    {"minimo": 0.8, "nivel": "low"},
+    {"minimo": 0.6, "nivel": "medium"},
+]
+
+
+def _valor(strategy: dict, campo: str, padrao=None):
+    # "icp_comportamento.expected_roas" -> strategy["icp_comportamento"]["expected_roas"]
+    atual = strategy
+    for parte in campo.split("."):
+        atual = (atual or {}).get(parte)
+    return padrao if atual is None else atual
+
+
+def carregar_regras(caminho: str = None) -> dict:
+    """
+    Carrega e pré-compila o conjunto de regras (padrão ou de um arquivo JSON).
+    """
+    regras, niveis = REGRAS_PADRAO, NIVEIS_RISCO_PADRAO
+
+    if caminho:
+        with open(caminho, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        regras = raw.get("regras", regras)
+        niveis = raw.get("niveis_risco", niveis)
+
+    compiladas = []
+    for regra in regras:
+        regra = dict(regra)
+        if regra["tipo"] == "contem_algum":
+            # Um único matcher para todos os termos da regra
+            regra["regex"] = re.compile("|".join(re.escape(t.lower()) for t in regra["termos"]))
+        compiladas.append(regra)
+
+    return {"regras": compiladas, "niveis_risco": niveis}
+
 
 class ScoreAgent:
+    REGRAS = carregar_regras(Config.SCORE_RULES_PATH)
+
     @staticmethod
-    def avaliar(strategy: dict) -> dict:
-        score = 1.0
-        flags = []
+    def recarregar_regras(caminho: str = None):
+        ScoreAgent.REGRAS = carregar_regras(caminho)
 
-        # ---------- 1. ICP DEMOGRÁFICO ----------
-        icp_demo = strategy.get("icp_demografia", {})
-        if not all([
-            icp_demo.get("age_range"),
-            icp_demo.get("gender"),
-            icp_demo.get("location")
-        ]):
-            score -= 0.2
-            flags.append("icp_incompleto")
-
-        # ---------- 2. MÉTRICAS COMPORTAMENTAIS ----------
-        icp_comp = strategy.get("icp_comportamento", {})
-        roas = icp_comp.get("expected_roas", 0)
-        cvr = icp_comp.get("conversion_rate", 0)
-        clicks = icp_comp.get("click_volume", 0)
-
-        # ROAS irrealista
-        if roas > 15:
-            score -= 0.15
-            flags.append("roas_irrealista")
-
-        # Conversão irrealista
-        if cvr > 25:
-            score -= 0.15
-            flags.append("conversao_irrealista")
-
-        # Baixo volume
-        if clicks < 100:
-            score -= 0.1
-            flags.append("baixo_volume_cliques")
-
-        # ---------- 3. CLAREZA DA MENSAGEM ----------
-        mensagem = strategy.get("mensagem_template", "").lower()
-        mensagens_genericas = [
-            "aproveite agora",
-            "não perca",
-            "o melhor para você",
-            "solução ideal"
-        ]
+    @staticmethod
+    def _regra_dispara(regra: dict, strategy: dict) -> bool:
+        tipo = regra["tipo"]
 
-        if any(m in mensagem for m in mensagens_genericas):
-            score -= 0.1
-            flags.append("mensagem_generica")
+        if tipo == "campos_obrigatorios":
+            return not all(_valor(strategy, campo) for campo in regra["campos"])
 
-        # ---------- 4. ALINHAMENTO COM PLATAFORMA ----------
-        plataforma = strategy.get("plataforma")
-        criativo = strategy.get("criativo_tipo", "").lower()
+        if tipo == "maior_que":
+            return _valor(strategy, regra["campo"], regra.get("padrao")) > regra["limite"]
 
-        if plataforma == "google_ads" and "video" in criativo:
-            score -= 0.1
-            flags.append("criativo_incompativel_plataforma")
+        if tipo == "menor_que":
+            return _valor(strategy, regra["campo"], regra.get("padrao")) < regra["limite"]
+
+        if tipo == "contem_algum":
+            if any(strategy.get(k) != v for k, v in regra.get("quando", {}).items()):
+                return False
+            texto = (_valor(strategy, regra["campo"]) or "").lower()
+            return regra["regex"].search(texto) is not None
+
+        raise ValueError(f"Tipo de regra desconhecido: {tipo}")
+
+    @staticmethod
+    def _nivel_risco(score: float) -> str:
+        for nivel in ScoreAgent.REGRAS["niveis_risco"]:
+            if score >= nivel["minimo"]:
+                return nivel["nivel"]
+        return "high"
+
+    @staticmethod
+    def avaliar(strategy: dict) -> dict:
+        score = 1.0
+        flags = []
 
-        if plataforma == "meta_ads" and "search" in criativo:
-            score -= 0.1
-            flags.append("criativo_incompativel_plataforma")
+        for regra in ScoreAgent.REGRAS["regras"]:
+            if ScoreAgent._regra_dispara(regra, strategy):
+                score -= regra["penalidade"]
+                flags.append(regra["flag"])
 
         # ---------- NORMALIZAÇÃO ----------
         score = max(round(score, 2), 0.0)
 
-        # ---------- RISCO ----------
-        if score >= 0.8:
-            risk = "low"
-        elif score >= 0.6:
-            risk = "medium"
-        else:
-            risk = "high"
-
         return {
             "confidence_score": score,
-            "risk_level": risk,
+            "risk_level": ScoreAgent._nivel_risco(score),
             "flags": flags,
             "avaliado_em": datetime.utcnow().isoformat()
         }
+
+    # ---------- AVALIAÇÃO EM LOTE ----------
+    @staticmethod
+    def _colunas(estrategias) -> pd.DataFrame:
+        """
+        Tabela colunar só com os campos usados pelas regras
+        (nomes achatados, ex.: "icp_comportamento.expected_roas").
+        """
+        if isinstance(estrategias, pd.DataFrame):
+            return estrategias
+
+        campos = set()
+        for regra in ScoreAgent.REGRAS["regras"]:
+            campos.update(regra.get("campos", []))
+            campos.update([regra["campo"]] if "campo" in regra else [])
+            campos.update(regra.get("quando", {}))
+
+        return pd.DataFrame({
+            campo: [_valor(e, campo) for e in estrategias]
+            for campo in sorted(campos)
+        })
+
+    @staticmethod
+    def _mascara(regra: dict, df: pd.DataFrame) -> np.ndarray:
+        tipo = regra["tipo"]
+
+        if tipo == "campos_obrigatorios":
+            presentes = np.ones(len(df), dtype=bool)
+            for campo in regra["campos"]:
+                if campo not in df:
+                    return np.ones(len(df), dtype=bool)
+                presentes &= df[campo].fillna("").astype(bool).to_numpy()
+            return ~presentes
+
+        if tipo in ("maior_que", "menor_que"):
+            if regra["campo"] in df:
+                valores = pd.to_numeric(df[regra["campo"]], errors="coerce").to_numpy(dtype=float)
+            else:
+                valores = np.full(len(df), np.nan)
+            valores = np.where(np.isnan(valores), regra.get("padrao", np.nan), valores)
+            if tipo == "maior_que":
+                return valores > regra["limite"]
+            return valores < regra["limite"]
+
+        if tipo == "contem_algum":
+            if regra["campo"] not in df:
+                return np.zeros(len(df), dtype=bool)
+            texto = df[regra["campo"]].fillna("").astype(str).str.lower()
+            mascara = texto.str.contains(regra["regex"]).to_numpy(dtype=bool)
+            for campo, esperado in regra.get("quando", {}).items():
+                if campo not in df:
+                    return np.zeros(len(df), dtype=bool)
+                mascara = mascara & (df[campo] == esperado).to_numpy(dtype=bool)
+            return mascara
+
+        raise ValueError(f"Tipo de regra desconhecido: {tipo}")
+
+    @staticmethod
+    def avaliar_lote(estrategias) -> pd.DataFrame:
+        """
+        Avalia várias estratégias de uma vez (lista de dicts ou DataFrame com colunas achatadas).
+        Mesmas regras e mesma ordem de penalidades que avaliar, vetorizado em NumPy/pandas.
+        Retorna confidence_score, risk_level e uma coluna booleana por flag.
+        """
+        df = ScoreAgent._colunas(estrategias)
+        score = np.ones(len(df))
+        flags = {}
+
+        for regra in ScoreAgent.REGRAS["regras"]:
+            mascara = ScoreAgent._mascara(regra, df)
+            score = score - regra["penalidade"] * mascara
+            flags[regra["flag"]] = flags.get(regra["flag"], False) | mascara
+
+        score = np.maximum(np.round(score, 2), 0.0)
+
+        niveis = ScoreAgent.REGRAS["niveis_risco"]
+        risco = np.select(
+            [score >= nivel["minimo"] for nivel in niveis],
+            [nivel["nivel"] for nivel in niveis],
+            default="high"
+        )
+
+        resultado = pd.DataFrame({"confidence_score": score, "risk_level": risco}, index=df.index)
+        for flag, mascara in flags.items():
+            resultado[f"flag_{flag}"] = mascara
+        resultado["avaliado_em"] = datetime.utcnow().isoformat()
+
+        return resultado
+
+    @staticmethod
+    def resultados_lote(avaliacao: pd.DataFrame) -> list:
+        """
+        Converte a saída de avaliar_lote para o formato de avaliar (um dict por estratégia).
+        """
+        colunas_flag = [c for c in avaliacao.columns if c.startswith("flag_")]
+        flags = avaliacao[colunas_flag].to_numpy()
+
+        return [
+            {
+                "confidence_score": float(score),
+                "risk_level": risco,
+                "flags": [colunas_flag[j][len("flag_"):] for j in np.flatnonzero(linha)],
+                "avaliado_em": avaliado_em
+            }
+            for score, risco, linha, avaliado_em in zip(
+                avaliacao["confidence_score"], avaliacao["risk_level"], flags, avaliacao["avaliado_em"]
+            )
+        ]
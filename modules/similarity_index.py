@@ -0,0 +1,279 @@
+import hashlib
+import os
+import re
+import unicodedata
+import numpy as np
+from sqlalchemy import select, func
+from config import Config
+from modules.persistence import SessionLocal, CampaignStrategy, STATUS_APROVADOS, segment_key
+
+INDEX_FILE = "data/similarity_index.npz"  # cache das assinaturas já calculadas
+FORMATO_CACHE = 3  # muda quando o conteúdo do cache muda; cache de outro formato é reconstruído
+
+NUM_PERM = 128
+BANDAS = 16             # 16 bandas x 8 linhas → candidatos a partir de Jaccard ~0.7
+LINHAS = NUM_PERM // BANDAS
+LIMIAR_JACCARD = 0.8    # similaridade estimada para considerar quase duplicata
+
+_PRIMO = np.uint64((1 << 31) - 1)
+_rng = np.random.RandomState(42)  # permutações fixas: assinaturas estáveis entre execuções
+_A = _rng.randint(1, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, (1 << 31) - 1, size=NUM_PERM).astype(np.uint64)
+
+
+def _normalizar(texto) -> str:
+    sem_acento = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"\s+", " ", sem_acento).strip().lower()
+
+
+def tokens_estrategia(estrategia: dict) -> set:
+    """
+    Conjunto de features usado no Jaccard: palavras-chave, interesses e
+    trigramas de palavras da mensagem.
+    """
+    tokens = {"kw:" + _normalizar(p) for p in estrategia.get("palavras_chave") or []}
+    tokens |= {"int:" + _normalizar(i) for i in estrategia.get("icp_interesses") or []}
+
+    palavras = re.findall(r"\w+", _normalizar(estrategia.get("mensagem_template") or ""))
+    if len(palavras) < 3:
+        tokens |= {"msg:" + " ".join(palavras)} if palavras else set()
+    else:
+        tokens |= {"msg:" + " ".join(palavras[i:i + 3]) for i in range(len(palavras) - 2)}
+
+    return tokens
+
+
+def escopo(estrategia: dict) -> str:
+    """
+    Plataforma + objetivo + segmento: só estratégias do mesmo escopo contam como
+    duplicata (os tokens não têm demografia; o mesmo texto para outro público não é cópia).
+    """
+    return "|".join((
+        estrategia.get("plataforma") or "",
+        estrategia.get("objetivo") or "",
+        segment_key(estrategia.get("icp_demografia")) or ""
+    ))
+
+
+def assinatura(estrategia: dict):
+    """
+    Assinatura MinHash (NUM_PERM valores uint32) ou None se não houver conteúdo.
+    """
+    tokens = tokens_estrategia(estrategia)
+    if not tokens:
+        return None
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in tokens],
+        dtype=np.uint64
+    ) % _PRIMO
+
+    # (a * h + b) mod p para todas as permutações de uma vez; mínimo por permutação
+    permutados = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIMO
+    return permutados.min(axis=1).astype(np.uint32)
+
+
+class SimilarityIndex:
+    """
+    Índice LSH (MinHash + bandas) das estratégias já persistidas.
+    Consulta custa o cálculo de uma assinatura + BANDAS lookups em dicionário,
+    independente do número de estratégias indexadas.
+    Só estratégias aprovadas do mesmo escopo (plataforma, objetivo, segmento) contam como duplicata.
+    """
+
+    def __init__(self):
+        self.assinaturas = {}                         # strategy_id -> assinatura
+        self.escopos = {}                             # strategy_id -> escopo(estrategia)
+        self.inativos = set()                         # ids fora de STATUS_APROVADOS (relidos a cada carga)
+        self.ultimo_id = 0                            # maior strategy_id já processado (com ou sem assinatura)
+        self.buckets = [dict() for _ in range(BANDAS)]  # por banda: chave -> [strategy_id]
+
+    def __len__(self):
+        return len(self.assinaturas)
+
+    def _adicionar_assinatura(self, strategy_id: int, sig, escopo_estrategia: str):
+        self.assinaturas[strategy_id] = sig
+        self.escopos[strategy_id] = escopo_estrategia
+        for banda in range(BANDAS):
+            chave = sig[banda * LINHAS:(banda + 1) * LINHAS].tobytes()
+            self.buckets[banda].setdefault(chave, []).append(strategy_id)
+
+    def adicionar(self, strategy_id: int, estrategia: dict):
+        self.ultimo_id = max(self.ultimo_id, strategy_id)
+        sig = assinatura(estrategia)
+        if sig is not None:
+            self._adicionar_assinatura(strategy_id, sig, escopo(estrategia))
+            self.inativos.discard(strategy_id)
+
+    def buscar_duplicata(self, estrategia: dict = None, sig=None, escopo_estrategia: str = None):
+        """
+        Retorna (strategy_id, similaridade) da estratégia aprovada e indexada
+        mais parecida, do mesmo escopo, acima de LIMIAR_JACCARD, ou None.
+        """
+        sig = assinatura(estrategia) if sig is None else sig
+        if sig is None:
+            return None
+
+        if escopo_estrategia is None and estrategia is not None:
+            escopo_estrategia = escopo(estrategia)
+
+        candidatos = set()
+        for banda in range(BANDAS):
+            chave = sig[banda * LINHAS:(banda + 1) * LINHAS].tobytes()
+            candidatos.update(self.buckets[banda].get(chave, ()))
+
+        melhor = None
+        for strategy_id in candidatos:
+            if strategy_id in self.inativos:
+                continue
+            if escopo_estrategia is not None and self.escopos.get(strategy_id) != escopo_estrategia:
+                continue
+
+            similaridade = float(np.mean(self.assinaturas[strategy_id] == sig))
+            if similaridade >= LIMIAR_JACCARD and (melhor is None or similaridade > melhor[1]):
+                melhor = (strategy_id, similaridade)
+
+        return melhor
+
+    def filtrar_duplicatas(self, estrategias: list):
+        """
+        Remove candidatas quase idênticas a estratégias aprovadas do mesmo escopo
+        ou a outra candidata anterior da mesma lista. Retorna (unicas, descartadas);
+        em descartadas, "duplicata_de" é o strategy_id persistido (int) ou
+        "candidata_<index>".
+        """
+        unicas, descartadas, aceitas = [], [], []
+
+        for idx, estrategia in enumerate(estrategias):
+            sig = assinatura(estrategia)
+            escopo_estrategia = escopo(estrategia)
+            duplicata = (
+                self.buscar_duplicata(sig=sig, escopo_estrategia=escopo_estrategia)
+                if sig is not None else None
+            )
+
+            if duplicata is None and sig is not None:
+                for anterior, sig_anterior, escopo_anterior in aceitas:
+                    if escopo_anterior != escopo_estrategia:
+                        continue
+                    similaridade = float(np.mean(sig_anterior == sig))
+                    if similaridade >= LIMIAR_JACCARD:
+                        duplicata = (f"candidata_{anterior}", similaridade)
+                        break
+
+            if duplicata:
+                descartadas.append({
+                    "index": idx,
+                    "duplicata_de": duplicata[0],
+                    "similaridade": round(duplicata[1], 3)
+                })
+                continue
+
+            unicas.append(estrategia)
+            if sig is not None:
+                aceitas.append((idx, sig, escopo_estrategia))
+
+        return unicas, descartadas
+
+    # --- Persistência do índice ---
+    @staticmethod
+    def _origem() -> str:
+        # Identifica o banco; o cache de outro banco é descartado
+        return hashlib.sha1(str(Config.DATABASE_URL).encode()).hexdigest()[:12]
+
+    @staticmethod
+    def _impressao_banco(db, ate_id: int) -> str:
+        """
+        Contagem, maior id e maior data_criacao das estratégias com id <= ate_id.
+        Muda se o banco for recriado no mesmo caminho ou se linhas forem removidas,
+        casos em que as assinaturas do cache não correspondem mais aos ids.
+        """
+        contagem, maior_id, maior_data = db.execute(
+            select(
+                func.count(CampaignStrategy.id),
+                func.max(CampaignStrategy.id),
+                func.max(CampaignStrategy.data_criacao)
+            ).where(CampaignStrategy.id <= ate_id)
+        ).one()
+        return f"{contagem}|{maior_id or 0}|{maior_data or ''}"
+
+    def salvar(self, caminho: str = INDEX_FILE):
+        ids = np.array(list(self.assinaturas), dtype=np.int64)
+        sigs = (
+            np.stack(list(self.assinaturas.values()))
+            if self.assinaturas else np.empty((0, NUM_PERM), dtype=np.uint32)
+        )
+
+        temporario = caminho + ".tmp"
+        escopos = np.array([self.escopos[i] for i in self.assinaturas], dtype=str)
+
+        with SessionLocal() as db:
+            impressao = self._impressao_banco(db, self.ultimo_id)
+
+        with open(temporario, "wb") as f:
+            np.savez(
+                f, ids=ids, assinaturas=sigs, escopos=escopos,
+                origem=np.array(self._origem()), formato=np.array(FORMATO_CACHE),
+                ultimo_id=np.array(self.ultimo_id), impressao=np.array(impressao)
+            )
+        os.replace(temporario, caminho)
+
+    @classmethod
+    def carregar(cls, caminho: str = INDEX_FILE, lote: int = 5000) -> "SimilarityIndex":
+        """
+        Carrega o cache de assinaturas e indexa apenas as estratégias do banco
+        com id maior que o último já processado. O cache só é usado se a impressão
+        do banco (contagem/maior id/data até esse id) ainda for a mesma. O status muda
+        depois da criação, então os ids não aprovados são relidos a cada carga.
+        """
+        indice = cls()
+        novos = 0
+        cache_usado = False
+
+        with SessionLocal() as db:
+            if os.path.exists(caminho):
+                cache = np.load(caminho)
+                # Cache de formato antigo ou de outro banco é descartado e reconstruído
+                valido = (
+                    "formato" in cache.files and int(cache["formato"]) == FORMATO_CACHE
+                    and str(cache["origem"]) == cls._origem()
+                )
+
+                if valido and str(cache["impressao"]) != cls._impressao_banco(db, int(cache["ultimo_id"])):
+                    print("⚠️ Cache do índice de similaridade não corresponde ao banco → reconstruindo.")
+                    valido = False
+
+                if valido:
+                    cache_usado = True
+                    indice.ultimo_id = int(cache["ultimo_id"])
+                    for strategy_id, sig, escopo_estrategia in zip(cache["ids"], cache["assinaturas"], cache["escopos"]):
+                        indice._adicionar_assinatura(int(strategy_id), sig, str(escopo_estrategia))
+
+            ultimo_id = indice.ultimo_id
+            linhas = db.execute(
+                select(
+                    CampaignStrategy.id,
+                    CampaignStrategy.plataforma,
+                    CampaignStrategy.objetivo,
+                    CampaignStrategy.icp_demografia,
+                    CampaignStrategy.palavras_chave,
+                    CampaignStrategy.icp_interesses,
+                    CampaignStrategy.mensagem_template
+                )
+                .where(CampaignStrategy.id > ultimo_id)
+                .order_by(CampaignStrategy.id)
+                .execution_options(yield_per=lote)
+            )
+
+            for linha in linhas:
+                indice.adicionar(linha.id, linha._asdict())
+                novos += 1
+
+            indice.inativos = set(db.execute(
+                select(CampaignStrategy.id).where(CampaignStrategy.status.not_in(STATUS_APROVADOS))
+            ).scalars())
+
+        if novos or not cache_usado:
+            indice.salvar(caminho)
+
+        return indice
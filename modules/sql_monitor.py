@@ -0,0 +1,143 @@
+import re
+import time
+from sqlalchemy import event
+from config import Config
+from modules.tracing import estagio_atual, incrementar
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_ESPACOS = re.compile(r"\s+")
+
+# Estatísticas da execução atual (um processo = uma execução do pipeline)
+_stats = {
+    "statements": 0,      # statements lógicos (executemany conta cada conjunto de parâmetros)
+    "round_trips": 0,     # chamadas ao cursor + commits/rollbacks
+    "tempo_total_s": 0.0,
+    "lentas": [],
+    "por_estagio": {}
+}
+_repeticoes = {}          # statement normalizado -> {"count": n, "tempo_s": t}
+_repetidas_avisadas = set()
+
+
+def normalizar(statement: str) -> str:
+    """
+    Remove literais e espaços extras: a mesma query com valores diferentes
+    vira a mesma chave (e nenhum valor vai parar no log).
+    """
+    sem_literais = _LITERAL_TEXTO.sub("'?'", statement)
+    sem_literais = _LITERAL_NUMERO.sub("?", sem_literais)
+    return _ESPACOS.sub(" ", sem_literais).strip()
+
+
+def _parametros_redigidos(parameters, executemany: bool) -> str:
+    # Só a forma dos parâmetros (quantidade/nomes), nunca os valores
+    if executemany:
+        return f"<{len(parameters)} conjuntos de parâmetros>"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}=?" for k in parameters) + "}"
+    if parameters:
+        return f"<{len(parameters)} parâmetros>"
+    return "<sem parâmetros>"
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("precog_inicio_query", []).append(time.perf_counter())
+
+
+def _depois(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info["precog_inicio_query"].pop()
+    chave = normalizar(statement)
+    estagio = estagio_atual() or "sem_estagio"
+
+    _stats["statements"] += len(parameters) if executemany else 1
+    _stats["round_trips"] += 1
+    _stats["tempo_total_s"] += duracao
+
+    por_estagio = _stats["por_estagio"].setdefault(estagio, {"round_trips": 0, "tempo_s": 0.0})
+    por_estagio["round_trips"] += 1
+    por_estagio["tempo_s"] += duracao
+
+    repeticao = _repeticoes.setdefault(chave, {"count": 0, "tempo_s": 0.0})
+    repeticao["count"] += 1
+    repeticao["tempo_s"] += duracao
+
+    incrementar("precog_sql_round_trips_total", stage=estagio)
+    incrementar("precog_sql_seconds_total", duracao, stage=estagio)
+
+    if duracao * 1000 >= Config.SQL_SLOW_QUERY_MS:
+        lenta = {
+            "statement": chave,
+            "parametros": _parametros_redigidos(parameters, executemany),
+            "duracao_ms": round(duracao * 1000, 1),
+            "estagio": estagio
+        }
+        _stats["lentas"].append(lenta)
+        print(f"🐢 [SQL] Query lenta ({lenta['duracao_ms']} ms, {estagio}): {chave[:200]} {lenta['parametros']}")
+
+    if repeticao["count"] == Config.SQL_REPEAT_THRESHOLD and chave not in _repetidas_avisadas:
+        _repetidas_avisadas.add(chave)
+        print(f"⚠️ [SQL] Mesma query executada {repeticao['count']}x ({estagio}), possível N+1: {chave[:200]}")
+
+
+def _fim_transacao(conn):
+    _stats["round_trips"] += 1
+
+
+def instalar(engine):
+    """
+    Registra os hooks de medição na engine. Sem efeito se SQL_MONITOR_ENABLED=false.
+    """
+    if not Config.SQL_MONITOR_ENABLED:
+        return
+
+    event.listen(engine, "before_cursor_execute", _antes)
+    event.listen(engine, "after_cursor_execute", _depois)
+    event.listen(engine, "commit", _fim_transacao)
+    event.listen(engine, "rollback", _fim_transacao)
+
+
+def resumo() -> dict:
+    repetidas = sorted(
+        (
+            {"statement": chave, "execucoes": r["count"], "tempo_ms": round(r["tempo_s"] * 1000, 1)}
+            for chave, r in _repeticoes.items()
+            if r["count"] >= Config.SQL_REPEAT_THRESHOLD
+        ),
+        key=lambda r: r["execucoes"],
+        reverse=True
+    )
+
+    return {
+        "statements": _stats["statements"],
+        "round_trips": _stats["round_trips"],
+        "statements_distintos": len(_repeticoes),
+        "tempo_total_ms": round(_stats["tempo_total_s"] * 1000, 1),
+        "por_estagio": {
+            estagio: {"round_trips": v["round_trips"], "tempo_ms": round(v["tempo_s"] * 1000, 1)}
+            for estagio, v in _stats["por_estagio"].items()
+        },
+        "lentas": list(_stats["lentas"]),
+        "repetidas": repetidas
+    }
+
+
+def imprimir_resumo():
+    if not Config.SQL_MONITOR_ENABLED or not _stats["round_trips"]:
+        return
+
+    r = resumo()
+    print("\n🗄️ --- RESUMO SQL ---")
+    print(
+        f"Statements: {r['statements']} | Round-trips: {r['round_trips']} | "
+        f"Distintos: {r['statements_distintos']} | Tempo total: {r['tempo_total_ms']} ms"
+    )
+
+    for estagio, v in sorted(r["por_estagio"].items(), key=lambda item: -item[1]["tempo_ms"]):
+        print(f"  • {estagio}: {v['round_trips']} round-trips, {v['tempo_ms']} ms")
+
+    if r["lentas"]:
+        print(f"🐢 {len(r['lentas'])} query(s) acima de {Config.SQL_SLOW_QUERY_MS:g} ms")
+
+    for repetida in r["repetidas"]:
+        print(f"⚠️ {repetida['execucoes']}x ({repetida['tempo_ms']} ms): {repetida['statement'][:200]}")
@@ -1,33 +1,52 @@
 import json
+import math
+import time
 from google import genai
 from config import Config
+from modules.tracing import span, incrementar
 
-def gerar_estrategia_llm(padroes: dict, plataforma: str, objetivo: str) -> dict:
+MODELO_LLM = 'gemini-2.5-flash'
+
+# Estimativa local, usada só quando a contagem da API (count_tokens) não está disponível.
+# 4 caracteres/token é a média de textos em inglês; PT-BR com números e markdown fica
+# perto de 3. Após cada chamada a razão é recalibrada pelo usage_metadata real.
+CARACTERES_POR_TOKEN_INICIAL = 3.0
+_calibracao = {"caracteres": 0, "tokens": 0}
+
+
+def _compactar(texto: str) -> str:
     """
-    Usa o Google GenAI para gerar uma estratégia completa, preenchendo
-    os campos ricos do novo Schema do banco de dados.
+    Remove indentação, espaços repetidos e linhas vazias: mesmo conteúdo, menos tokens.
     """
+    linhas = (" ".join(linha.split()) for linha in texto.splitlines())
+    return "\n".join(linha for linha in linhas if linha)
 
-    if padroes.get("status") != "success":
-        raise ValueError("Dados insuficientes para gerar estratégia.")
 
-    demografico = padroes.get('icp_demografia', {})
-    metricas = padroes.get('icp_comportamento', {})
+def caracteres_por_token() -> float:
+    if _calibracao["tokens"]:
+        return _calibracao["caracteres"] / _calibracao["tokens"]
+    return CARACTERES_POR_TOKEN_INICIAL
 
-    prompt = f"""
-    # AGENTE ESTRATEGISTA DE PERFORMANCE (ARQUITETURA AGÊNTICA)
 
-    ## 1. INPUT DE DADOS (FONTE ÚNICA DE VERDADE)
-    Resumo Analítico: {padroes["insight_text"]}
+def estimar_tokens(texto: str) -> int:
+    return math.ceil(len(texto) / caracteres_por_token())
 
-    Perfil Demográfico do ICP:
-    - Faixa etária: {padroes["icp_demografia"]["age_range"]} | Gênero: {padroes["icp_demografia"]["gender"]} | Localização: {padroes["icp_demografia"]["location"]}
 
-    Comportamento Observado:
-    - ROAS esperado: {padroes["icp_comportamento"]["expected_roas"]} | Taxa de conversão: {padroes["icp_comportamento"]["conversion_rate"]}% | Cliques: {padroes["icp_comportamento"]["click_volume"]}
+def _calibrar(caracteres: int, prompt_tokens: int):
+    # Acumula os totais observados: a razão converge para a tokenização real do modelo
+    if prompt_tokens:
+        _calibracao["caracteres"] += caracteres
+        _calibracao["tokens"] += prompt_tokens
 
-    Contexto:
-    - Plataforma: {plataforma} | Objetivo: {objetivo}
+
+# Parte fixa do prompt: idêntica em todas as chamadas, enviada como system_instruction.
+# Não conta com cache implícito do provedor: o Gemini 2.5 Flash só reaproveita prefixos
+# a partir de 1024 tokens (2.5 Pro: 2048) e estas instruções têm poucas centenas.
+# A separação mantém a parte por execução compacta e o orçamento previsível.
+PROMPT_INSTRUCOES = _compactar("""
+    # AGENTE ESTRATEGISTA DE PERFORMANCE (ARQUITETURA AGÊNTICA)
+
+    Você recebe, na mensagem do usuário, o INPUT DE DADOS de um segmento (fonte única de verdade).
 
     Ao definir icp_interesses e palavras_chave:
     - Baseie-se apenas em sinais implícitos do comportamento observado
@@ -35,24 +54,24 @@ def gerar_estrategia_llm(padroes: dict, plataforma: str, objetivo: str) -> dict:
 
     ---
 
-    ## 2. REGRAS DE SEGURANÇA E ALINHAMENTO (GUARDRAILS)
+    ## REGRAS DE SEGURANÇA E ALINHAMENTO (GUARDRAILS)
     - **Fidelidade Estrita:** NÃO altere dados demográficos ou métricas observadas.
     - **Proibição de Alucinação:** NÃO utilize tendências externas, personas fictícias ou suposições fora do contexto fornecido.
     - **Estilo:** Use linguagem clara, objetiva e ampla, em português brasileiro.
     - **Restrição de Saída:** Retorne EXCLUSIVAMENTE um JSON válido, sem qualquer texto introdutório ou conclusivo.
-    
+
     ---
 
-    ## 3. INSTRUÇÕES DE PENSAMENTO (CoT IMPLÍCITO)
+    ## INSTRUÇÕES DE PENSAMENTO (CoT IMPLÍCITO)
     Antes de gerar o JSON, analise internamente:
-    1. Como o ROAS de {metricas.get('expected_roas')} influencia a agressividade da oferta?
-    2. Qual tom de voz conecta melhor com {demografico.get('gender')} de {demografico.get('age_range')} anos?
+    1. Como o ROAS esperado influencia a agressividade da oferta?
+    2. Qual tom de voz conecta melhor com o gênero e a faixa etária do ICP?
     3. Revise se os interesses sugeridos são compatíveis com o comportamento de conversão observado.
 
     ---
 
-    ## 4. FORMATO DE SAÍDA (JSON OBRIGATÓRIO)
-    {{
+    ## FORMATO DE SAÍDA (JSON OBRIGATÓRIO)
+    {
     "perfil_alvo_descricao": "string",
     "icp_interesses": ["string"],
     "mensagem_template": "string",
@@ -60,20 +79,139 @@ def gerar_estrategia_llm(padroes: dict, plataforma: str, objetivo: str) -> dict:
     "criativo_tipo": "string",
     "posicionamentos": ["string"],
     "racional_estrategico": "string (Explique brevemente por que essa estratégia funcionará para este público específico)"
-    }}
+    }
+""")
+
+
+def montar_dados_prompt(padroes: dict, plataforma: str, objetivo: str, incluir_historico: bool = True) -> str:
     """
+    Parte variável do prompt (dados desta execução), já compactada.
+    """
+    demografico = padroes["icp_demografia"]
+    metricas = padroes["icp_comportamento"]
+
+    dados = f"""
+    ## INPUT DE DADOS
+    Resumo Analítico: {padroes["insight_text"]}
+
+    Perfil Demográfico do ICP:
+    - Faixa etária: {demografico["age_range"]} | Gênero: {demografico["gender"]} | Localização: {demografico["location"]}
+
+    Comportamento Observado:
+    - ROAS esperado: {metricas["expected_roas"]} | Taxa de conversão: {metricas["conversion_rate"]}% | Cliques: {metricas["click_volume"]}
+
+    Contexto:
+    - Plataforma: {plataforma} | Objetivo: {objetivo}
+    """
+
+    # Contexto opcional: é o primeiro a sair quando o orçamento de tokens aperta
+    historico = padroes.get("baseline_historico")
+    if incluir_historico and historico:
+        dados += f"""
+    Histórico do segmento:
+    - ROAS: {historico["roas"]} | Taxa de conversão: {historico["conversion_rate"]}% | Execuções: {historico["execucoes"]}
+    """
+
+    return _compactar(dados)
+
+
+def contar_tokens(client, dados: str) -> tuple:
+    """
+    Tokens do prompt completo (instruções + dados) e a origem da contagem.
+    Usa a estimativa local calibrada; só consulta count_tokens do provedor
+    (um round-trip bloqueante) quando a estimativa cai a menos de
+    LLM_COUNT_TOKENS_MARGIN do orçamento, onde o erro da estimativa decide.
+    """
+    texto = PROMPT_INSTRUCOES + "\n" + dados
+    estimativa = estimar_tokens(texto)
+    orcamento = Config.LLM_PROMPT_TOKEN_BUDGET
+    perto_do_limite = abs(estimativa - orcamento) <= orcamento * Config.LLM_COUNT_TOKENS_MARGIN
+
+    if client is not None and Config.LLM_COUNT_TOKENS_API and perto_do_limite:
+        try:
+            # count_tokens da Gemini API não aceita system_instruction: conta o texto concatenado
+            resposta = client.models.count_tokens(model=MODELO_LLM, contents=texto)
+            if resposta.total_tokens:
+                return resposta.total_tokens, "api"
+        except Exception as e:
+            print(f"⚠️ [LLM] count_tokens indisponível ({e}); usando estimativa local.")
+
+    return estimativa, "estimativa"
+
+
+def _registrar_uso(uso: dict):
+    print(
+        f"🔢 [LLM] prompt={uso['prompt_tokens']} ({uso['contagem_origem']} {uso['prompt_tokens_contados']}, "
+        f"cache {uso['cached_tokens']}) | resposta={uso['response_tokens']} | {uso['latencia_ms']} ms"
+    )
+
+    incrementar("precog_llm_calls_total", modelo=MODELO_LLM)
+    incrementar("precog_llm_latency_seconds_total", uso["latencia_ms"] / 1000, modelo=MODELO_LLM)
+    incrementar("precog_llm_tokens_total", uso["prompt_tokens"], modelo=MODELO_LLM, tipo="prompt")
+    incrementar("precog_llm_tokens_total", uso["cached_tokens"], modelo=MODELO_LLM, tipo="cached")
+    incrementar("precog_llm_tokens_total", uso["response_tokens"], modelo=MODELO_LLM, tipo="response")
+
+
+def gerar_estrategia_llm(padroes: dict, plataforma: str, objetivo: str) -> dict:
+    """
+    Usa o Google GenAI para gerar uma estratégia completa, preenchendo
+    os campos ricos do novo Schema do banco de dados.
+    """
+
+    if padroes.get("status") != "success":
+        raise ValueError("Dados insuficientes para gerar estratégia.")
+
+    demografico = padroes.get('icp_demografia', {})
+    metricas = padroes.get('icp_comportamento', {})
 
     try:
         client = genai.Client(api_key=Config.LLM_API_KEY)
-        
-        response = client.models.generate_content(
-            model='gemini-2.5-flash', 
-            contents=prompt,
-            config={
-                'response_mime_type': 'application/json'
-            }
+    except Exception as e:
+        # Sem cliente: orçamento pela estimativa local e geração cai no fallback abaixo
+        print(f"⚠️ [LLM] Cliente indisponível: {e}")
+        client = None
+
+    # Orçamento de tokens do prompt (instruções fixas + dados da execução)
+    dados = montar_dados_prompt(padroes, plataforma, objetivo)
+    tokens_prompt, origem = contar_tokens(client, dados)
+
+    if tokens_prompt > Config.LLM_PROMPT_TOKEN_BUDGET:
+        dados = montar_dados_prompt(padroes, plataforma, objetivo, incluir_historico=False)
+        tokens_prompt, origem = contar_tokens(client, dados)
+
+    if tokens_prompt > Config.LLM_PROMPT_TOKEN_BUDGET:
+        raise ValueError(
+            f"Prompt com {tokens_prompt} tokens ({origem}) excede o orçamento "
+            f"de {Config.LLM_PROMPT_TOKEN_BUDGET} (LLM_PROMPT_TOKEN_BUDGET)."
         )
-        
+
+    try:
+        with span("llm_call", modelo=MODELO_LLM, prompt_tokens_contados=tokens_prompt, contagem_origem=origem) as s:
+            inicio = time.perf_counter()
+            response = client.models.generate_content(
+                model=MODELO_LLM,
+                contents=dados,
+                config={
+                    'system_instruction': PROMPT_INSTRUCOES,
+                    'response_mime_type': 'application/json'
+                }
+            )
+            latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+            metadata = getattr(response, "usage_metadata", None)
+            uso = {
+                "prompt_tokens_contados": tokens_prompt,
+                "contagem_origem": origem,
+                "prompt_tokens": getattr(metadata, "prompt_token_count", None) or 0,
+                "cached_tokens": getattr(metadata, "cached_content_token_count", None) or 0,
+                "response_tokens": getattr(metadata, "candidates_token_count", None) or 0,
+                "latencia_ms": latencia_ms
+            }
+            s.set(**uso)
+
+        _registrar_uso(uso)
+        _calibrar(len(PROMPT_INSTRUCOES) + 1 + len(dados), uso["prompt_tokens"])
+
         llm_output = json.loads(response.text)
 
         if not isinstance(llm_output, dict):
@@ -95,7 +233,7 @@ def gerar_estrategia_llm(padroes: dict, plataforma: str, objetivo: str) -> dict:
             "criativo_tipo": llm_output.get("criativo_tipo"),
             "posicionamentos": llm_output.get("posicionamentos") or [],
             "racional_estrategico": llm_output.get("racional_estrategico"),
-            "versao_modelo_llm": "gemini-2.5-flash"
+            "versao_modelo_llm": MODELO_LLM
         }
         return estrategia_final
 
@@ -0,0 +1,248 @@
+import atexit
+import contextvars
+import json
+import os
+import time
+import tracemalloc
+import uuid
+from config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUN_ID = uuid.uuid4().hex[:12]
+
+_span_atual = contextvars.ContextVar("span_atual", default=None)
+_spans = []     # spans finalizados nesta execução
+_metricas = {}  # (nome, labels) -> valor (contadores livres, ex.: tokens da LLM)
+_exportacao_registrada = False
+
+
+class _SpanNulo:
+    """
+    Retornado quando o tracing está desligado: nenhuma medição, nenhuma alocação.
+    """
+    __slots__ = ()
+
+    def set(self, **atributos):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULO = _SpanNulo()
+
+
+class Span:
+    __slots__ = (
+        "nome", "atributos", "id", "pai", "inicio", "_wall", "_cpu", "_pico",
+        "duracao_s", "cpu_s", "pico_memoria_bytes", "rss_max_kb", "erro", "_token"
+    )
+
+    def __init__(self, nome: str, atributos: dict):
+        self.nome = nome
+        self.atributos = atributos
+        self.id = uuid.uuid4().hex[:8]
+        self.pai = None
+        self.erro = None
+        self.pico_memoria_bytes = None
+        self.rss_max_kb = None
+
+    def set(self, **atributos):
+        """
+        Anexa atributos ao span (ex.: rows=len(df), tokens=...).
+        """
+        self.atributos.update(atributos)
+
+    def __enter__(self):
+        pai = _span_atual.get()
+        self.pai = pai.id if pai else None
+        self._token = _span_atual.set(self)
+
+        if tracemalloc.is_tracing():
+            # O pico até aqui pertence ao pai; o contador é zerado para medir este span
+            if pai:
+                pai._pico = max(pai._pico, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._pico = 0
+
+        self.inicio = time.time()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, tipo, valor, tb):
+        self.duracao_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+
+        if tipo is not None:
+            self.erro = f"{tipo.__name__}: {valor}"
+
+        if tracemalloc.is_tracing():
+            self.pico_memoria_bytes = max(self._pico, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        # Pico de RSS do processo até o fim do span (barato, sempre disponível no Unix)
+        if resource is not None:
+            self.rss_max_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        _span_atual.reset(self._token)
+
+        pai = _span_atual.get()
+        if pai and self.pico_memoria_bytes is not None:
+            pai._pico = max(pai._pico, self.pico_memoria_bytes)
+
+        _spans.append(self)
+        return False
+
+    def to_dict(self) -> dict:
+        registro = {
+            "run_id": RUN_ID,
+            "span_id": self.id,
+            "parent_id": self.pai,
+            "name": self.nome,
+            "start": self.inicio,
+            "wall_s": round(self.duracao_s, 6),
+            "cpu_s": round(self.cpu_s, 6),
+            "attrs": self.atributos
+        }
+        if self.pico_memoria_bytes is not None:
+            registro["peak_mem_bytes"] = self.pico_memoria_bytes
+        if self.rss_max_kb is not None:
+            registro["max_rss_kb"] = self.rss_max_kb
+        if self.erro:
+            registro["error"] = self.erro
+        return registro
+
+
+def span(nome: str, **atributos):
+    """
+    Mede um estágio do pipeline (wall time, CPU, pico de memória) como span aninhado.
+    Uso: with span("analyze") as s: ...; s.set(rows=len(df))
+    """
+    if not Config.TRACING_ENABLED:
+        return _NULO
+
+    _registrar_exportacao()
+    return Span(nome, atributos)
+
+
+def incrementar(nome: str, valor: float = 1, **labels):
+    """
+    Contador livre exportado junto com as métricas dos spans.
+    """
+    if not Config.TRACING_ENABLED:
+        return
+
+    _registrar_exportacao()
+    chave = (nome, tuple(sorted(labels.items())))
+    _metricas[chave] = _metricas.get(chave, 0) + valor
+
+
+def estagio_atual():
+    """
+    Nome do span ativo (ou None), para atribuir medições externas ao estágio.
+    """
+    atual = _span_atual.get()
+    return atual.nome if atual else None
+
+
+def _registrar_exportacao():
+    global _exportacao_registrada
+
+    if _exportacao_registrada:
+        return
+
+    _exportacao_registrada = True
+    if Config.TRACE_MEMORY and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    atexit.register(exportar)
+
+
+def _labels(pares) -> str:
+    if not pares:
+        return ""
+    corpo = ",".join(
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"'
+        for k, v in pares
+    )
+    return "{" + corpo + "}"
+
+
+def _prometheus() -> str:
+    """
+    Formato texto do Prometheus (compatível com o textfile collector do node_exporter).
+    """
+    por_estagio = {}
+    for s in _spans:
+        agregado = por_estagio.setdefault(s.nome, {"count": 0, "wall": 0.0, "cpu": 0.0, "rows": 0, "mem": None})
+        agregado["count"] += 1
+        agregado["wall"] += s.duracao_s
+        agregado["cpu"] += s.cpu_s
+        agregado["rows"] += s.atributos.get("rows", 0) or 0
+        if s.pico_memoria_bytes is not None:
+            agregado["mem"] = max(agregado["mem"] or 0, s.pico_memoria_bytes)
+
+    linhas = []
+
+    def serie(nome, tipo, ajuda, valores):
+        linhas.append(f"# HELP {nome} {ajuda}")
+        linhas.append(f"# TYPE {nome} {tipo}")
+        for labels, valor in valores:
+            linhas.append(f"{nome}{_labels(labels)} {valor}")
+
+    run = ("run_id", RUN_ID)
+    serie("precog_stage_calls_total", "counter", "Execuções do estágio.",
+          [((run, ("stage", n)), a["count"]) for n, a in por_estagio.items()])
+    serie("precog_stage_wall_seconds_total", "counter", "Tempo de parede acumulado por estágio.",
+          [((run, ("stage", n)), round(a["wall"], 6)) for n, a in por_estagio.items()])
+    serie("precog_stage_cpu_seconds_total", "counter", "Tempo de CPU acumulado por estágio.",
+          [((run, ("stage", n)), round(a["cpu"], 6)) for n, a in por_estagio.items()])
+    serie("precog_stage_rows_total", "counter", "Linhas processadas por estágio.",
+          [((run, ("stage", n)), a["rows"]) for n, a in por_estagio.items()])
+
+    com_memoria = [(n, a) for n, a in por_estagio.items() if a["mem"] is not None]
+    if com_memoria:
+        serie("precog_stage_peak_memory_bytes", "gauge", "Pico de memória Python (tracemalloc) por estágio.",
+              [((run, ("stage", n)), a["mem"]) for n, a in com_memoria])
+
+    if resource is not None:
+        serie("precog_process_max_rss_kilobytes", "gauge", "Pico de RSS do processo.",
+              [((run,), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)])
+
+    for nome in sorted({n for n, _ in _metricas}):
+        serie(nome, "counter", "Contador do pipeline.",
+              [((run,) + labels, valor) for (n, labels), valor in _metricas.items() if n == nome])
+
+    return "\n".join(linhas) + "\n"
+
+
+def exportar():
+    """
+    Grava os spans da execução (JSON lines, append) e as métricas (Prometheus, sobrescreve).
+    Chamada automaticamente no fim do processo quando o tracing está ligado.
+    """
+    if not _spans and not _metricas:
+        return
+
+    for caminho in (Config.TRACE_FILE, Config.METRICS_FILE):
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+    with open(Config.TRACE_FILE, "a", encoding="utf-8") as f:
+        for s in _spans:
+            f.write(json.dumps(s.to_dict(), ensure_ascii=False, default=str) + "\n")
+
+    temporario = Config.METRICS_FILE + ".tmp"
+    with open(temporario, "w", encoding="utf-8") as f:
+        f.write(_prometheus())
+    os.replace(temporario, Config.METRICS_FILE)
+
+    _spans.clear()